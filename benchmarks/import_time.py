@@ -0,0 +1,69 @@
+"""
+Import-time benchmark for the application entry points.
+
+Each module is imported in a fresh interpreter; the best of several runs is
+compared against STARTUP_IMPORT_BUDGET_SECONDS. The run also fails if any of
+the heavy dependencies in WARMUP_MODULES is imported eagerly.
+
+    python -m benchmarks.import_time [--runs 5] [--budget 0.5]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from config.configs import STARTUP_IMPORT_BUDGET_SECONDS, WARMUP_MODULES
+
+# Modules imported at startup by main.py, ui.py and frontend/ui.py
+ENTRY_MODULES = [
+    "main",
+    "chat.conversational_agent",
+    "chat.retriever",
+    "ingestion.ingest",
+    "utils.warmup",
+]
+
+_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+def measure_import(module, runs=5):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best, heavy = None, []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=WARMUP_MODULES)],
+            cwd=repo_root, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        heavy = result["heavy"]
+        best = result["elapsed"] if best is None else min(best, result["elapsed"])
+    return best, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when startup import time regresses.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET_SECONDS)
+    args = parser.parse_args()
+
+    failed = False
+    for module in ENTRY_MODULES:
+        elapsed, heavy = measure_import(module, runs=args.runs)
+        status = "ok"
+        if elapsed > args.budget:
+            status = f"OVER BUDGET ({args.budget:.2f}s)"
+            failed = True
+        if heavy:
+            status = f"EAGER IMPORTS: {', '.join(heavy)}"
+            failed = True
+        print(f"{module:<30} {elapsed * 1000:8.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Peak-RSS benchmark for PDF ingestion.
+
+Generates synthetic PDFs of the requested page counts and ingests each one in a
+fresh interpreter inside a temporary working directory. The peak RSS growth
+during ingestion should stay roughly flat as the page count grows; it is bounded
+by EMBEDDING_BATCH_SIZE (plus the index itself), not by the size of the corpus.
+
+    python -m benchmarks.ingest_peak_rss [--pages 200 2000] [--max-growth-mb 0]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PARAGRAPH = (
+    "Attention mechanisms let a model weigh every position of the input sequence "
+    "when computing the representation of a single position. "
+)
+
+def make_pdf(path, pages):
+    import pymupdf
+
+    doc = pymupdf.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        text = f"Page {page_num}. " + _PARAGRAPH * 12
+        page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def _peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _child():
+    """Runs inside the benchmark subprocess, with cwd set to the temporary workdir."""
+    from utils.warmup import preload_heavy_modules
+    from ingestion import ingest
+    import utils.vector_store as vector_store
+
+    preload_heavy_modules(background=False)
+    vector_store._get_embedding_model().embed_query("warm-up")
+    baseline = _peak_rss_mb()
+
+    ingest.main()
+    peak = _peak_rss_mb()
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": peak}))
+
+def run(pages):
+    with tempfile.TemporaryDirectory() as workdir:
+        source_dir = os.path.join(workdir, "data", "source_data")
+        os.makedirs(source_dir)
+        make_pdf(os.path.join(source_dir, f"manual_{pages}.pdf"), pages)
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.ingest_peak_rss", "--child"],
+            cwd=workdir, capture_output=True, text=True,
+            env={**os.environ, "PYTHONPATH": REPO_ROOT},
+        )
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak RSS of PDF ingestion.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--max-growth-mb", type=float, default=0,
+                        help="Fail if ingestion grows RSS by more than this (0 disables the check)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child()
+        return
+
+    from config.configs import EMBEDDING_BATCH_SIZE
+    print(f"EMBEDDING_BATCH_SIZE={EMBEDDING_BATCH_SIZE}")
+
+    failed = False
+    for pages in args.pages:
+        result = run(pages)
+        growth = result["peak_mb"] - result["baseline_mb"]
+        status = "ok"
+        if args.max_growth_mb and growth > args.max_growth_mb:
+            status = f"OVER BUDGET ({args.max_growth_mb:.0f} MB)"
+            failed = True
+        print(f"{pages:>6} pages  baseline {result['baseline_mb']:8.1f} MB  "
+              f"peak {result['peak_mb']:8.1f} MB  growth {growth:7.1f} MB  {status}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Calibrates SCORE_THRESHOLD_DEFAULT (cosine similarity) on the published index.
+
+Two score distributions are measured with the configured embedding model:
+ - noise: similarity between random pairs of chunks from different documents,
+   i.e. what an unrelated chunk typically scores;
+ - queries: best-hit similarity for each query. Queries come from --queries (one per
+   line; real user questions give the most faithful numbers) or, by default, from
+   word windows sampled out of random chunks. Such pseudo-queries score higher than
+   real questions, so treat their coverage as an upper bound.
+
+The recommended threshold is the --noise-percentile of the noise distribution,
+rounded up to 0.05 (chunks above it are unlikely to be unrelated), lowered if needed
+so that at least --min-coverage of the queries still get one chunk. The coverage
+table shows, per threshold, the share of queries that get at least one chunk.
+
+    python -m benchmarks.score_threshold [--queries questions.txt] [--pairs 20000] [--samples 200]
+"""
+import math
+import random
+import argparse
+from utils.vector_store import get_vector_store, _get_embedding_model, _query_array
+from config.configs import SCORE_THRESHOLD_DEFAULT, TOP_K_DEFAULT
+
+def _index_vectors(db):
+    import numpy as np
+
+    vectors = db.index.reconstruct_n(0, db.index.ntotal).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def noise_scores(db, vectors, pairs, rng):
+    """Cosine similarity of random chunk pairs belonging to different documents."""
+    doc_ids = [db.docstore.search(db.index_to_docstore_id[i]).metadata.get("doc_id") for i in range(len(vectors))]
+    scores = []
+    for _ in range(pairs * 10):
+        if len(scores) >= pairs:
+            break
+        i, j = rng.randrange(len(vectors)), rng.randrange(len(vectors))
+        if doc_ids[i] != doc_ids[j]:
+            scores.append(float(vectors[i] @ vectors[j]))
+    return scores
+
+def pseudo_queries(db, samples, rng, words=12):
+    queries = []
+    for i in rng.sample(range(db.index.ntotal), min(samples, db.index.ntotal)):
+        tokens = db.docstore.search(db.index_to_docstore_id[i]).page_content.split()
+        start = rng.randrange(max(len(tokens) - words, 0) + 1)
+        if tokens:
+            queries.append(" ".join(tokens[start:start + words]))
+    return queries
+
+def query_scores(vectors, queries):
+    """Descending similarities of every chunk, per query (top TOP_K_DEFAULT kept)."""
+    embeddings = _get_embedding_model()
+    results = []
+    for query in queries:
+        similarities = vectors @ _query_array(embeddings.embed_query(query))[0]
+        results.append(sorted(similarities.tolist(), reverse=True)[:TOP_K_DEFAULT])
+    return results
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive the retrieval similarity threshold from the index.")
+    parser.add_argument("--queries", help="File with one query per line (default: pseudo-queries from chunks)")
+    parser.add_argument("--pairs", type=int, default=20000, help="Random chunk pairs for the noise distribution")
+    parser.add_argument("--samples", type=int, default=200, help="Pseudo-queries to sample")
+    parser.add_argument("--noise-percentile", type=float, default=99.0)
+    parser.add_argument("--min-coverage", type=float, default=0.9, help="Share of queries that must get a chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db, version = get_vector_store()
+    vectors = _index_vectors(db)
+    print(f"Index {version}: {len(vectors)} chunks")
+
+    noise = noise_scores(db, vectors, args.pairs, rng)
+    if not noise:
+        print("Need chunks from at least two documents to measure the noise distribution.")
+        return
+    print("Noise (unrelated pairs): " + "  ".join(
+        f"p{p}={_percentile(noise, p):.3f}" for p in (50, 90, 95, 99)
+    ))
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = pseudo_queries(db, args.samples, rng)
+    scores = query_scores(vectors, queries)
+    best = [s[0] for s in scores]
+    print(f"Best hit over {len(queries)} queries: " + "  ".join(
+        f"p{p}={_percentile(best, p):.3f}" for p in (10, 25, 50)
+    ))
+
+    recommended = math.ceil(_percentile(noise, args.noise_percentile) * 20) / 20
+    # Highest 0.05 step that keeps min_coverage of the queries answered
+    coverage_limit = math.floor(_percentile(best, 100 * (1 - args.min_coverage)) * 20) / 20
+    if coverage_limit < recommended:
+        print(f"Noise p{args.noise_percentile:g} ({recommended:.2f}) would leave more than "
+              f"{1 - args.min_coverage:.0%} of queries without context; the embedding model "
+              f"separates related and unrelated chunks poorly on this corpus.")
+        recommended = coverage_limit
+    print(f"\n{'threshold':>9}  {'queries with >=1 chunk':>22}  {'mean chunks (<= top_k)':>22}")
+    for threshold in sorted({round(0.05 * t, 2) for t in range(2, 19)} | {SCORE_THRESHOLD_DEFAULT, recommended}):
+        covered = sum(1 for s in best if s >= threshold) / len(best)
+        mean_hits = sum(sum(1 for x in s if x >= threshold) for s in scores) / len(scores)
+        marks = (" <- recommended" if threshold == recommended else "") + \
+                (" <- current" if threshold == SCORE_THRESHOLD_DEFAULT else "")
+        print(f"{threshold:>9.2f}  {covered:>22.1%}  {mean_hits:>22.2f}{marks}")
+    print(f"\nSet SCORE_THRESHOLD_DEFAULT = {recommended} in config/configs.py")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-turn token counting overhead of the conversation memory.
+
+Simulates a conversation and times, for every turn, what pruning costs: counting
+the whole message buffer. Compares the local TokenCounter (cached per message)
+with llm.get_num_tokens_from_messages, which ChatGroq backs with a HuggingFace
+GPT-2 tokenizer and re-runs over the full history every turn.
+
+    python -m benchmarks.token_counting [--turns 50] [--counter auto] [--no-baseline]
+"""
+import time
+import argparse
+from utils.token_counter import get_token_counter
+
+def _conversation(turns):
+    from langchain_core.messages import HumanMessage, AIMessage
+
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"Question {turn}: how does attention scale with sequence length? " * 4))
+        messages.append(AIMessage(content=f"Answer {turn}: self-attention is quadratic in the sequence length. " * 12))
+        yield list(messages)
+
+def time_per_turn(count_messages, turns):
+    timings = []
+    for buffer in _conversation(turns):
+        start = time.perf_counter()
+        count_messages(buffer)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def _report(name, timings):
+    first, last = timings[0] * 1000, timings[-1] * 1000
+    mean = sum(timings) / len(timings) * 1000
+    print(f"{name:<34} first turn {first:8.3f} ms  last turn {last:8.3f} ms  mean {mean:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-turn token counting overhead.")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--counter", default="auto")
+    parser.add_argument("--no-baseline", action="store_true", help="Skip llm.get_num_tokens_from_messages")
+    args = parser.parse_args()
+
+    counter = get_token_counter(args.counter)
+    _report(f"TokenCounter ({counter.name})", time_per_turn(counter.count_messages, args.turns))
+
+    if not args.no_baseline:
+        try:
+            from chat.retriever import get_llm
+            llm = get_llm()
+            llm.get_num_tokens("warm-up")  # exclude the one-off tokenizer load
+            _report("llm.get_num_tokens_from_messages", time_per_turn(llm.get_num_tokens_from_messages, args.turns))
+        except Exception as e:
+            print(f"Baseline unavailable: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from typing import Any, Callable, Iterator, List, Optional
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from utils.exceptions import LLMCacheMissError
+from utils.llm_cache import make_cache_key, get_llm_cache
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    Chat model that records responses of an underlying chat model to the on-disk
+    LLM cache and replays them for identical (model, temperature, messages) calls.
+
+    mode="record" serves hits and stores misses; mode="replay" serves hits only and
+    raises LLMCacheMissError otherwise. The underlying model is created by
+    llm_factory on the first miss, so replay runs never construct it (no API key
+    or network needed). Works for invoke() and stream().
+    """
+
+    model_name: str
+    temperature: float = 0
+    mode: str = "record"
+    llm_factory: Callable[[], BaseChatModel]
+    response_cache: Any = None
+
+    _llm: Optional[BaseChatModel] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cached-chat-model"
+
+    def _get_llm(self) -> BaseChatModel:
+        if self._llm is None:
+            self._llm = self.llm_factory()
+        return self._llm
+
+    def _get_cache(self):
+        return self.response_cache or get_llm_cache()
+
+    def _lookup(self, messages: List[BaseMessage], stop: Optional[List[str]]):
+        key = make_cache_key(
+            self.model_name, self.temperature, [(m.type, m.content) for m in messages], stop
+        )
+        record = self._get_cache().get(key) if self.mode != "off" else None
+        if record is None and self.mode == "replay":
+            raise LLMCacheMissError(
+                f"No cached response for {self.model_name} (key {key[:12]}) in replay mode."
+            )
+        return key, record
+
+    def _store(self, key: str, chunks: List[str]):
+        if self.mode != "record":
+            return
+        self._get_cache().put(key, {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "content": "".join(chunks),
+            "chunks": chunks,
+        })
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        key, record = self._lookup(messages, stop)
+        if record is not None:
+            content = record["content"]
+        else:
+            content = self._get_llm().invoke(messages, stop=stop, **kwargs).content
+            self._store(key, [content])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _emit(self, piece: str, run_manager) -> ChatGenerationChunk:
+        chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        if run_manager:
+            run_manager.on_llm_new_token(piece, chunk=chunk)
+        return chunk
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        key, record = self._lookup(messages, stop)
+        if record is not None:
+            # Replay with the recorded chunking
+            for piece in record.get("chunks") or [record["content"]]:
+                yield self._emit(piece, run_manager)
+            return
+
+        received = []
+        for message_chunk in self._get_llm().stream(messages, stop=stop, **kwargs):
+            received.append(message_chunk.content)
+            yield self._emit(message_chunk.content, run_manager)
+        self._store(key, received)
@@ -1,40 +1,68 @@
-from langchain_groq import ChatGroq
 from utils.logger import setup_logger
 from utils.memory import create_memory
+from utils.token_counter import get_token_counter
 from utils.prompt_templates import CONV_SYSTEM_TEMPLATE, CONV_USER_QUERY_TEMPLATE
 from utils.exceptions import RetrievalError, RAGException
-from chat.retriever import retrieve
-from config.configs import LLM_MODEL_NAME, MAX_MEMORY_TOKENS, MAX_BUFFER_SIZE, TOP_K_DEFAULT, SCORE_THRESHOLD_DEFAULT
-import time
+from chat.retriever import retrieve, get_llm
+from config.configs import MAX_MEMORY_TOKENS, MAX_BUFFER_SIZE, MAX_PROMPT_TOKENS, TOP_K_DEFAULT, SCORE_THRESHOLD_DEFAULT
 
 class ConversationalAgent:
     def __init__(self, session_id):
         self.logger = setup_logger(session_id)
-        self.llm = ChatGroq(model_name=LLM_MODEL_NAME, temperature=0)
-        self.memory = create_memory(self.llm, max_token_limit=MAX_MEMORY_TOKENS, max_buffer_size=MAX_BUFFER_SIZE)
+        self.llm = get_llm(temperature=0)
+        self.token_counter = get_token_counter()
+        self.memory = create_memory(self.llm, max_token_limit=MAX_MEMORY_TOKENS, max_buffer_size=MAX_BUFFER_SIZE,
+                                    token_counter=self.token_counter)
         # self.memory.llm = self.llm
         self.last_response = None
 
-    def respond(self, user_query):
-        try:
-            # Retrieval step
-            chunks = retrieve(user_query, top_k=TOP_K_DEFAULT, score_threshold=SCORE_THRESHOLD_DEFAULT, logger=self.logger)
+    def _fit_snippets(self, user_query, chunks):
+        """
+        Formats retrieved chunks (best first) until the prompt would exceed MAX_PROMPT_TOKENS.
+        History is counted per message from the memory's cached counts. Always keeps the best chunk.
+        """
+        used = (
+            self.token_counter.count(CONV_SYSTEM_TEMPLATE)
+            + self.token_counter.count(CONV_USER_QUERY_TEMPLATE)
+            + self.token_counter.count(user_query)
+            + self.memory.buffer_token_count()
+        )
+        snippets = []
+        for c in chunks:
+            snippet = f"[{c['doc_id']} pg {c['page_num']}] {c['content']}"
+            tokens = self.token_counter.count(snippet)
+            if snippets and used + tokens > MAX_PROMPT_TOKENS:
+                self.logger.info(f"Prompt budget reached: using {len(snippets)} of {len(chunks)} chunks.")
+                break
+            snippets.append(snippet)
+            used += tokens
+        self.logger.debug(f"Prompt tokens (estimated): {used}")
+        return snippets
 
-            # Format retrieved snippets
-            snippet_text = "\n".join(
-                f"[{c['doc_id']} pg {c['page_num']}] {c['content']}"
-                for c in chunks
-            )
+    def _prepare(self, user_query):
+        """Runs retrieval and renders the generation messages. Returns (messages, chunks)."""
+        # Retrieval step
+        chunks = retrieve(user_query, top_k=TOP_K_DEFAULT, score_threshold=SCORE_THRESHOLD_DEFAULT, logger=self.logger)
 
-            # Render prompt
-            prompt = CONV_USER_QUERY_TEMPLATE.format(
-                query=user_query,
-                chat_history=self.memory.load_memory_variables({})["chat_history"],
-                retrieved_chunks=snippet_text
-            )
+        # Format retrieved snippets within the prompt token budget
+        snippets = self._fit_snippets(user_query, chunks)
+        chunks = chunks[:len(snippets)]
+        snippet_text = "\n".join(snippets)
+
+        # Render prompt
+        prompt = CONV_USER_QUERY_TEMPLATE.format(
+            query=user_query,
+            chat_history=self.memory.load_memory_variables({})["chat_history"],
+            retrieved_chunks=snippet_text
+        )
+        return [("system", CONV_SYSTEM_TEMPLATE), ("human", prompt)], chunks
+
+    def respond(self, user_query):
+        try:
+            messages, chunks = self._prepare(user_query)
 
             # Generation
-            response = self.llm.invoke([("system", CONV_SYSTEM_TEMPLATE), ("human", prompt)])
+            response = self.llm.invoke(messages)
             reply = response.content
 
             # Update memory
@@ -47,19 +75,21 @@ class ConversationalAgent:
             raise RAGException("Conversational pipeline error") from e
 
     def stream_response(self, query: str):
-        """Stream the response word by word"""
+        """Stream the response as the LLM generates it (or replays it from the LLM cache)"""
         try:
-            # Use the existing respond method to get the full result
-            result = self.respond(query)
-            self.last_response = result  # Store for later reference
+            messages, chunks = self._prepare(query)
+
+            pieces = []
+            for chunk in self.llm.stream(messages):
+                pieces.append(chunk.content)
+                yield chunk.content
 
-            # Split response into words and yield them with small delays
-            words = result["reply"].split()
-            for i, word in enumerate(words):
-                yield word + (" " if i < len(words) - 1 else "")
-                time.sleep(0.05)  # Adjust delay as needed
+            reply = "".join(pieces)
+            self.memory.save_context({"input": query}, {"output": reply})
+            self.last_response = {"reply": reply, "retrieved": chunks}  # Store for later reference
 
         except Exception as e:
+            self.logger.exception("Streaming conversation failed.")
             yield f"Error: {str(e)}"
             self.last_response = None
 
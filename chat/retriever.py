@@ -1,22 +1,56 @@
 import json
-from typing import List, Dict, Any
-from langchain_groq import ChatGroq
+import threading
+from typing import List, Dict, Any, TYPE_CHECKING
 from utils.logger import setup_logger
-from utils.exceptions import RetrievalError
-from utils.vector_store import load_vector_store
-from dotenv import load_dotenv
-from config.configs import TOP_K_DEFAULT, SCORE_THRESHOLD_DEFAULT, LLM_MODEL_NAME
+from utils.exceptions import RetrievalError, LLMCacheMissError
+from utils.vector_store import (
+    get_vector_store,
+    get_index_version,
+    range_search_by_vector,
+    similarity_search_by_vector,
+    _get_embedding_model,
+)
+from utils.query_cache import embedding_cache, retrieval_cache, get_cache_stats, make_key, normalize_query
+from config.configs import TOP_K_DEFAULT, SCORE_THRESHOLD_DEFAULT, RETRIEVAL_MODE, LLM_MODEL_NAME, LLM_CACHE_MODE
 from utils.prompt_templates import RETRIEVER_SYSTEM_TEMPLATE, RETRIEVER_USER_QUERY_TEMPLATE
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+_env_loaded = False
+
+def _load_env():
+    # Load environment variables once, on the first LLM construction
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 # LLM Setup (Groq)
-def get_llm():
-    return ChatGroq(model_name=LLM_MODEL_NAME, temperature=0)
+def _create_groq_llm(temperature: float = 0):
+    from langchain_groq import ChatGroq
+    _load_env()
+    return ChatGroq(model_name=LLM_MODEL_NAME, temperature=temperature)
+
+def get_llm(temperature: float = 0):
+    """
+    Returns the chat model, wrapped in the on-disk record/replay cache unless
+    LLM_CACHE_MODE is "off". The Groq client is only created on a cache miss.
+    """
+    if LLM_CACHE_MODE == "off":
+        return _create_groq_llm(temperature)
+
+    from chat.cached_llm import CachedChatModel
+    return CachedChatModel(
+        model_name=LLM_MODEL_NAME,
+        temperature=temperature,
+        mode=LLM_CACHE_MODE,
+        llm_factory=lambda: _create_groq_llm(temperature),
+    )
 
 # Extract metadata filters via LLM
-def extract_filters_from_query(query: str, llm: ChatGroq, logger) -> Dict[str, str]:
+def extract_filters_from_query(query: str, llm: "BaseChatModel", logger) -> Dict[str, str]:
 #     prompt = f"""
 # You are an highly skilled helpful assistant that reads user search queries and extracts metadata filters.
 # Return a JSON object with optional keys: doc_id, page_num, date.
@@ -33,12 +67,48 @@ def extract_filters_from_query(query: str, llm: ChatGroq, logger) -> Dict[str, s
             filters = json.loads(resp.content)
             return filters
         return {}
+    except LLMCacheMissError:
+        raise
     except Exception as e:
         logger.warning(f"Failed to extract filters via LLM: {e}")
         return {}
 
+def embed_query(normalized_query: str) -> List[float]:
+    """Embeds a normalized query, reusing cached embeddings of identical queries."""
+    embedding = embedding_cache.get(normalized_query)
+    if embedding is None:
+        embedding = _get_embedding_model().embed_query(normalized_query)
+        embedding_cache.put(normalized_query, embedding)
+    return embedding
+
+def _matches(metadata, filters):
+    return all(key not in metadata or str(metadata[key]) == str(val) for key, val in filters.items())
+
+def _match_location(metadata, filters):
+    """
+    Returns (metadata, duplicates) for the first location of a chunk that satisfies the
+    metadata filters: the chunk itself, else one of the near-duplicates merged into it
+    at ingest (so deduplicated text is still found by a filter on its own document).
+    Returns None if no location matches.
+    """
+    duplicates = metadata.get("duplicates", [])
+    if _matches(metadata, filters):
+        return metadata, duplicates
+    for i, ref in enumerate(duplicates):
+        location = {**metadata, **ref}
+        if _matches(location, filters):
+            own = {key: metadata.get(key) for key in ref}
+            return location, [own] + duplicates[:i] + duplicates[i + 1:]
+    return None
+
 # Main retrieval function
-def retrieve(query: str, top_k: int = TOP_K_DEFAULT, score_threshold: float = SCORE_THRESHOLD_DEFAULT, logger=None) -> List[Dict[str, Any]]:
+def retrieve(query: str, top_k: int = TOP_K_DEFAULT, score_threshold: float = SCORE_THRESHOLD_DEFAULT, logger=None,
+             mode: str = RETRIEVAL_MODE) -> List[Dict[str, Any]]:
+    """
+    Returns up to top_k chunks with cosine similarity >= score_threshold, best first.
+    mode="range" fetches exactly the chunks above the threshold with one FAISS range
+    search; mode="top_k" fetches the 2 * top_k nearest chunks and filters those.
+    """
     if logger is None:
         logger = setup_logger("retrieval")
 
@@ -47,42 +117,99 @@ def retrieve(query: str, top_k: int = TOP_K_DEFAULT, score_threshold: float = SC
         filters = extract_filters_from_query(query, llm, logger)
         logger.debug(f"Metadata filters extracted: {filters}")
 
-        # Load vector store
-        embeddings = load_vector_store()
-        retriever = embeddings.as_retriever(search_kwargs={"k": top_k * 2})
+        # Load vector store (reloaded only when the index changed)
+        embeddings, index_version = get_vector_store()
+
+        normalized = normalize_query(query)
+        cache_key = make_key(normalized, filters, mode, top_k, score_threshold, index_version)
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Retrieved {len(cached)} chunks (cached) for query: {query}")
+            return [dict(r) for r in cached]
 
         # Perform semantic search
         # docs_and_scores = retriever.get_relevant_documents(query)
         # docs_and_scores = retriever.invoke(query) ####
-        docs_and_scores = embeddings.similarity_search_with_score(query, k=top_k * 2)
+        query_embedding = embed_query(normalized)
+        if mode == "range":
+            # Metadata filters are applied afterwards, so do not cap at top_k yet when filtering
+            max_results = embeddings.index.ntotal if filters else top_k
+            docs_and_scores = range_search_by_vector(embeddings, query_embedding, score_threshold, max_results)
+        else:
+            docs_and_scores = similarity_search_by_vector(embeddings, query_embedding, k=top_k * 2)
         # logger.debug(f"Retrieved {len(docs_and_scores)} documents before filtering.")
         # logger.debug(f"Retrieved documents: {docs_and_scores}")
-        # docs_and_scores: list of Document with metadata and score
+        # docs_and_scores: list of Document with metadata and cosine similarity
 
         # Filter by metadata and threshold
         results = []
         for doc, score in docs_and_scores:
             if score is not None and score < score_threshold:
                 continue
-            # metadata match
-            matched = True
-            for key, val in filters.items():
-                if key in doc.metadata and str(doc.metadata[key]) != str(val):
-                    matched = False
-                    break
-            if matched:
+            location = _match_location(doc.metadata, filters)
+            if location is not None:
+                metadata, duplicates = location
                 results.append({
-                    "chunk_id": doc.metadata.get("chunk_id"),
-                    "doc_id": doc.metadata.get("doc_id"),
-                    "page_num": doc.metadata.get("page_num"),
+                    "chunk_id": metadata.get("chunk_id"),
+                    "doc_id": metadata.get("doc_id"),
+                    "page_num": metadata.get("page_num"),
                     "content": doc.page_content,
                     "score": score,
+                    # Other locations of the same (near-duplicate) text, merged at ingest
+                    "duplicates": duplicates,
                 })
         results = sorted(results, key=lambda x: x["score"], reverse=True)[:top_k]
+        retrieval_cache.put(cache_key, [dict(r) for r in results])
 
         logger.info(f"Retrieved {len(results)} chunks for query: {query}")
+        logger.debug(f"Query cache stats: {get_cache_stats()}")
         return results
 
     except Exception as e:
         logger.exception("Retrieval pipeline failed.")
         raise RetrievalError("Failed to retrieve relevant documents.") from e
+
+_warmed_queries = set()   # (normalized query, index version) warmed successfully
+_warming_queries = set()  # being warmed by a running warm-up
+_warmup_lock = threading.Lock()
+
+def warm_query_cache(queries: List[str], logger=None, background: bool = True):
+    """
+    Precomputes query embeddings and retrieval results for fixed prompts (UI templates,
+    FAQ cards) so their first use is served from cache. Each prompt is warmed once per
+    index version; a prompt whose retrieval fails is retried on the next call.
+    Returns the warm-up thread, or None if there was nothing to warm (or no index yet).
+    """
+    version = get_index_version()
+    if version is None:
+        # Nothing to retrieve from until the first index is published
+        return None
+    with _warmup_lock:
+        pending = [
+            q for q in queries
+            if (normalize_query(q), version) not in _warmed_queries | _warming_queries
+        ]
+        _warming_queries.update((normalize_query(q), version) for q in pending)
+    if not pending:
+        return None
+
+    def _warm():
+        for query in pending:
+            key = (normalize_query(query), version)
+            try:
+                retrieve(query, logger=logger)
+                with _warmup_lock:
+                    _warmed_queries.add(key)
+            except Exception as e:
+                if logger:
+                    logger.warning(f"Query cache warm-up failed for {query[:50]!r}: {e}")
+            finally:
+                with _warmup_lock:
+                    _warming_queries.discard(key)
+
+    if not background:
+        _warm()
+        return None
+    thread = threading.Thread(target=_warm, name="query-cache-warmup", daemon=True)
+    thread.start()
+    return thread
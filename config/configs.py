@@ -1,23 +1,93 @@
+import os
+
 # directory configurations
 SOURCE_DIR = "data/source_data"
 PROCESSED_DIR = "data/processed_data"
-VECTOR_STORE_DIR = "vector_store/faiss_index"
+VECTOR_STORE_DIR = "vector_store/faiss_index"  # snapshots/<version>/ + CURRENT pointer
+CHUNK_STORE_DIR = "data/chunk_store"  # durable content-addressed chunks, never pruned
 
 # state file for tracking ingestion
 STATE_FILE = "metadata/ingestion_state.json"
 
+# Index snapshots (utils/index_snapshots.py)
+SNAPSHOTS_TO_KEEP = 3  # published index versions kept for rollback, current one included
+INDEX_LOCK_TIMEOUT_SECONDS = 600  # how long a writer waits for another ingestion/rebuild to finish
+
 # Maximum number of session directories to keep and monitor
 MAX_SESSIONS_TO_KEEP = 5
 
 # LLM configuration
 LLM_MODEL_NAME = "llama-3.3-70b-versatile"
 
+# LLM response cache (utils/llm_cache.py)
+# "off": no caching, "record": serve cached responses and store new ones,
+# "replay": serve cached responses only and fail on a miss (offline, deterministic runs)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "record")
+LLM_CACHE_DIR = "data/llm_cache"
+LLM_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
 # RAG pipeline configurations
 MAX_MEMORY_TOKENS = 2000
 MAX_BUFFER_SIZE = 10
+MAX_PROMPT_TOKENS = 6000  # budget for system prompt + history + query + retrieved snippets
+
+# Token counting (utils/token_counter.py): "auto", "tiktoken" or "approximate"
+TOKEN_COUNTER = "auto"
+TOKEN_COUNT_CACHE_SIZE = 4096
 
 # Retrieval configuration
+# "range": every chunk with cosine similarity >= SCORE_THRESHOLD_DEFAULT, at most TOP_K_DEFAULT
+# "top_k": nearest TOP_K_DEFAULT chunks, then the same similarity threshold
+RETRIEVAL_MODE = "range"
 TOP_K_DEFAULT = 5
-SCORE_THRESHOLD_DEFAULT = 0.5
+# Cosine similarity in [-1, 1]. In range mode it alone decides whether a chunk is
+# context, so calibrate it per corpus/embedding model: python -m benchmarks.score_threshold
+# (noise floor of unrelated chunk pairs vs. best-hit scores of queries). 0.35 is a
+# starting point for all-MiniLM-L6-v2, whose unrelated passages mostly score below ~0.3
+# while question/passage matches mostly score above ~0.4.
+SCORE_THRESHOLD_DEFAULT = 0.35
+
+# Metric for newly created indexes: "cosine" (inner product on normalized vectors) or "l2".
+# Existing L2 indexes keep working; their distances are converted to cosine similarity.
+VECTOR_STORE_DISTANCE = "cosine"
+
+
+# Startup configuration
+# Modules preloaded in the background by utils.warmup.preload_heavy_modules
+WARMUP_MODULES = [
+    "langchain_groq",
+    "chat.cached_llm",
+    "langchain.memory",
+    "langchain_huggingface",
+    "langchain_community.vectorstores",
+    "langchain_community.document_loaders",
+    "langchain.text_splitter",
+]
+# Import-time budget (seconds) enforced by benchmarks/import_time.py
+STARTUP_IMPORT_BUDGET_SECONDS = 0.5
+
+# Watch-folder ingestion daemon (ingestion/watcher.py)
+WATCH_DEBOUNCE_SECONDS = 2.0      # quiet period after the last file event before ingesting
+WATCH_MAX_DELAY_SECONDS = 10.0    # publish at the latest this long after the first pending event
+WATCH_POLL_INTERVAL_SECONDS = 1.0 # polling fallback when watchdog/inotify is unavailable
+WATCH_RETRY_BACKOFF_SECONDS = 5.0 # first retry delay for a failed batch, doubled per consecutive failure
+WATCH_RETRY_MAX_BACKOFF_SECONDS = 300.0
+
+# Ingestion configuration
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 64  # chunks embedded and added to the index per batch
+INGESTION_JOB_HISTORY = 20  # finished background ingestion jobs kept for status lookups
 
+# Query cache configuration (utils/query_cache.py)
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 1024
+QUERY_EMBEDDING_CACHE_MAX_BYTES = 16 * 1024 * 1024
+RETRIEVAL_CACHE_MAX_ENTRIES = 256
+RETRIEVAL_CACHE_MAX_BYTES = 32 * 1024 * 1024
 
+# Near-duplicate chunk elimination at ingest (utils/dedup.py)
+DEDUP_ENABLED = True
+DEDUP_INDEX_FILE = "metadata/dedup_index.json"
+DEDUP_NUM_PERM = 64      # MinHash permutations
+DEDUP_BANDS = 16         # LSH bands (DEDUP_NUM_PERM / DEDUP_BANDS rows per band)
+DEDUP_SHINGLE_SIZE = 5   # words per shingle
+DEDUP_THRESHOLD = 0.85   # estimated Jaccard similarity above which chunks are merged
@@ -1,10 +1,25 @@
+import time
 import streamlit as st
-from ingestion.ingest import main as ingest_main
 from chat.conversational_agent import ConversationalAgent
+from utils.warmup import preload_heavy_modules
+from chat.retriever import warm_query_cache
 
 st.set_page_config(page_title="Advance-RAG Platform", layout="wide")
 
+# Import the LLM, embedding and ingestion stacks in the background while the page renders
+preload_heavy_modules()
+
+FAQ_PROMPTS = [
+    "What is the use of Attention in Transformers?",
+    "Summarize the main findings of the report.",
+    "Which document discusses self-attention?",
+]
+
+# Precompute retrieval for the FAQ cards in the background (once per index version)
+warm_query_cache(FAQ_PROMPTS)
+
 tabs = st.tabs(["Ingestion", "Chat"])
+poll_ingestion_job = False
 
 # --- Ingestion Tab ---
 with tabs[0]:
@@ -13,9 +28,25 @@ with tabs[0]:
     if st.button("Ingest Documents"):
         # Save files to SOURCE_DIR, then run ingestion
         # (Implement file saving logic here)
-        ingest_main()
-        st.success("Ingestion complete. Vector store updated.")
-    # Optionally show ingestion logs/status
+        from ingestion.jobs import get_job_queue
+        st.session_state.ingestion_job_id = get_job_queue().submit()
+
+    # Ingestion runs in a background worker; show the status of the last submitted job
+    if st.session_state.get("ingestion_job_id"):
+        from ingestion.jobs import get_job_queue, QUEUED, RUNNING, COMPLETED
+        job = get_job_queue().get_status(st.session_state.ingestion_job_id)
+        if job is None:
+            st.session_state.ingestion_job_id = None
+        elif job["status"] == COMPLETED:
+            st.success("Ingestion complete. Vector store updated.")
+        elif job["status"] in (QUEUED, RUNNING):
+            st.info(
+                f"Ingestion {job['status']}: {job['files_done']}/{job['files_total']} files, "
+                f"page {job['pages']} of {job['current_file'] or '-'}, {job['chunks']} chunks"
+            )
+            poll_ingestion_job = True
+        else:
+            st.error(f"Ingestion failed: {job['error']}")
 
 # --- Chat Tab ---
 with tabs[1]:
@@ -23,13 +54,8 @@ with tabs[1]:
     st.markdown("Ask questions and get answers from your ingested documents.")
     # Sample FAQ/Prompt Cards
     st.subheader("Sample Questions")
-    faq_prompts = [
-        "What is the use of Attention in Transformers?",
-        "Summarize the main findings of the report.",
-        "Which document discusses self-attention?",
-    ]
-    cols = st.columns(len(faq_prompts))
-    for i, prompt in enumerate(faq_prompts):
+    cols = st.columns(len(FAQ_PROMPTS))
+    for i, prompt in enumerate(FAQ_PROMPTS):
         with cols[i]:
             if st.button(prompt, key=f"faq_{i}"):
                 st.session_state["user_query"] = prompt
@@ -55,4 +81,9 @@ with tabs[1]:
         bg = "#e3f2fd" if sender == "user" else "#f1f8e9"
         chat_html += f"<div style='display:flex;justify-content:{align};'><div style='background:{bg};padding:0.9em 1.2em;border-radius:16px;margin-bottom:0.5em;max-width:70%;'><b>{sender.capitalize()}:</b> {msg}</div></div>"
     chat_html += "</div>"
-    st.markdown(chat_html, unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(chat_html, unsafe_allow_html=True)
+
+# Poll the ingestion job once both tabs are rendered
+if poll_ingestion_job:
+    time.sleep(1)
+    st.rerun()
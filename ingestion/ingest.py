@@ -1,78 +1,122 @@
 import os
 import json
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from utils.logger import generate_session_id, setup_logger
 from utils.file_utils import list_pdf_files
 from utils.exceptions import IngestionError
-from config.configs import SOURCE_DIR, PROCESSED_DIR
+from config.configs import SOURCE_DIR, PROCESSED_DIR, DEDUP_ENABLED
+from utils.dedup import NearDuplicateDetector, format_dedup_stats
+from utils.chunk_store import ChunkStore
+from utils.index_snapshots import index_write_lock
 
 from utils.metadata_tracker import (
     load_ingestion_state,
     save_ingestion_state,
     is_already_ingested,
     update_ingestion_record,
+    remove_ingestion_record,
 )
 from utils.file_utils import calculate_file_md5
-from utils.vector_store import create_or_update_vector_store
+from utils.vector_store import (
+    add_documents_in_batches,
+    get_document_ids,
+    get_ids_by_doc_id,
+    load_vector_store,
+    _save_vector_store,
+    _vector_store_exists,
+)
 
 def generate_doc_id(filename):
     return os.path.splitext(filename)[0].replace(" ", "_")
 
-def ingest_pdf(file_path, doc_id, session_dir, logger):
+def _report(progress, **fields):
+    if progress is not None:
+        progress(fields)
+
+def ingest_pdf(file_path, doc_id, session_dir, logger, progress=None):
+    """
+    Yields the chunks of a PDF page by page. Pages are loaded lazily and chunks are
+    streamed to the session's processed JSON file, so only one page is held in memory.
+    progress, if given, is called with {"pages": ..., "chunks": ...} after every page.
+    """
+    # PyMuPDF and the splitters are only needed once a PDF is actually processed
+    from langchain_community.document_loaders import PyMuPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     try:
         loader = PyMuPDFLoader(file_path)
-        pages = loader.load()
 
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=100,
             separators=["\n\n", "\n", ".", " "],
         )
-        all_chunks = []
-        for page_num, page in enumerate(pages, start=1):
-            chunks = splitter.split_documents([page])
-            for i, chunk in enumerate(chunks):
-                chunk.metadata.update({
-                    "chunk_id": f"{doc_id}_pg{page_num}_ch{i+1}",
-                    "doc_id": doc_id,
-                    "page_num": page_num,
-                    "source": file_path
-                })
-                all_chunks.append(chunk)
-
-        # Save processed chunks
+
+        # Save processed chunks as they are produced
         output_path = os.path.join(session_dir, f"{doc_id}.json")
+        num_chunks = 0
         with open(output_path, "w", encoding="utf-8") as f:
-            json.dump([doc.dict() for doc in all_chunks], f, indent=2, ensure_ascii=False)
-
-        logger.info(f"Processed {file_path} - {len(all_chunks)} chunks.")
-        return all_chunks
+            f.write("[")
+            for page_num, page in enumerate(loader.lazy_load(), start=1):
+                chunks = splitter.split_documents([page])
+                for i, chunk in enumerate(chunks):
+                    chunk.metadata.update({
+                        "chunk_id": f"{doc_id}_pg{page_num}_ch{i+1}",
+                        "doc_id": doc_id,
+                        "page_num": page_num,
+                        "source": file_path
+                    })
+                    f.write(",\n" if num_chunks else "\n")
+                    f.write(json.dumps(chunk.dict(), indent=2, ensure_ascii=False))
+                    num_chunks += 1
+                    yield chunk
+                _report(progress, pages=page_num, chunks=num_chunks)
+            f.write("\n]")
+
+        logger.info(f"Processed {file_path} - {num_chunks} chunks.")
 
     except Exception as e:
         logger.exception(f"Failed to ingest {file_path}")
         raise IngestionError(f"Failed to process {file_path}") from e
 
 
-def main():
-    session_id = generate_session_id()
-    logger = setup_logger(session_id)
-    logger.info(f"Starting ingestion session: {session_id}")
-
-    state = load_ingestion_state()
+def ingest_changes(changed_files, deleted_files, state, session_id, session_dir, logger, db=None,
+                   source_dir=SOURCE_DIR, progress=None):
+    """
+    Ingests added/changed files and drops deleted ones, then saves the vector store once.
+    Chunks are embedded and added to the index in batches of EMBEDDING_BATCH_SIZE while
+    each PDF is being read, so memory use does not grow with the size of the corpus.
+    progress, if given, is called with dicts of file/page/chunk counters.
+    With DEDUP_ENABLED, near-duplicate chunks are not embedded; the canonical chunk
+    records them under metadata["duplicates"].
+    The caller must hold index_write_lock() and have loaded `state` (and `db`) under it.
+    Returns (db, updated).
+    """
     updated = False
-    all_new_chunks = []
 
-    pdf_files = list_pdf_files(SOURCE_DIR)
-    if not pdf_files:
-        logger.warning("No PDF files found in source directory.")
-        return
-
-    session_dir = os.path.join(PROCESSED_DIR, session_id)
-    os.makedirs(session_dir, exist_ok=True)
-
-    for filename in pdf_files:
-        file_path = os.path.join(SOURCE_DIR, filename)
+    if db is None and _vector_store_exists():
+        db = load_vector_store()
+    # One docstore scan per batch; kept up to date as chunks are replaced or promoted
+    ids_by_doc = get_ids_by_doc_id(db) if db is not None else {}
+
+    chunk_store = ChunkStore()
+    detector = NearDuplicateDetector.load() if DEDUP_ENABLED else None
+    dedup_stats = {}
+
+    def _release(doc_id, previous_ids, detached):
+        """Drops the old chunks of doc_id, keeping the ones promoted to other documents."""
+        promoted = detector.release_doc(db, doc_id, previous_ids, detached) if detector is not None else {}
+        for store_id, new_doc_id in promoted.items():
+            ids_by_doc.setdefault(new_doc_id, []).append(store_id)
+        stale = [store_id for store_id in previous_ids if store_id not in promoted]
+        if stale:
+            db.delete(stale)
+
+    _report(progress, files_total=len(changed_files), files_done=0)
+    for files_done, filename in enumerate(changed_files):
+        _report(progress, files_done=files_done, current_file=filename, pages=0, chunks=0)
+        file_path = os.path.join(source_dir, filename)
+        if not os.path.exists(file_path):
+            continue
         checksum = calculate_file_md5(file_path)
 
         if is_already_ingested(filename, checksum, state):
@@ -80,21 +124,85 @@ def main():
             continue
 
         doc_id = generate_doc_id(filename)
+        # Chunks of a previous version of this file, replaced once the new version is in
+        previous_ids = ids_by_doc.pop(doc_id, [])
+        detached = None
+        if detector is not None and previous_ids:
+            # Do not deduplicate the new version against the one it replaces
+            detached = detector.detach_doc(doc_id)
         try:
-            new_chunks = ingest_pdf(file_path, doc_id, session_dir, logger)
-            all_new_chunks.extend(new_chunks)
-            update_ingestion_record(filename, checksum, session_id, state)
-            updated = True
+            chunks = ingest_pdf(file_path, doc_id, session_dir, logger, progress)
+            # Keep every chunk (duplicates included) so the index can be rebuilt without the PDFs
+            chunks = chunk_store.record_document(doc_id, chunks)
+            if detector is not None:
+                chunks = detector.filter_duplicates(chunks, dedup_stats)
+            db = add_documents_in_batches(chunks, db=db)
         except IngestionError as e:
             logger.warning(f"Skipped due to error: {filename}")
+            if detector is not None:
+                detector.restore_doc(doc_id, detached or {"signatures": {}, "refs": {}})
+            if db is not None:
+                partial_ids = set(get_document_ids(db, [doc_id])) - set(previous_ids)
+                if partial_ids:
+                    db.delete(list(partial_ids))
+            if previous_ids:
+                ids_by_doc[doc_id] = previous_ids
+            continue
+
+        if previous_ids:
+            _release(doc_id, previous_ids, detached)
+        update_ingestion_record(filename, checksum, session_id, state)
+        updated = True
+
+    _report(progress, files_done=len(changed_files), current_file=None)
+
+    for filename in deleted_files:
+        if remove_ingestion_record(filename, state) is not None:
+            logger.info(f"Removing deleted file: {filename}")
+            doc_id = generate_doc_id(filename)
+            previous_ids = ids_by_doc.pop(doc_id, [])
+            if previous_ids:
+                detached = detector.detach_doc(doc_id) if detector is not None else None
+                _release(doc_id, previous_ids, detached)
+            chunk_store.remove_document(doc_id)
+            updated = True
+
+    if detector is not None and updated:
+        if db is not None:
+            detector.apply_pending_refs(db)
+        detector.save()
+        if dedup_stats:
+            logger.info(format_dedup_stats(dedup_stats))
+
+    if updated and db is not None:
+        logger.info("Saving FAISS vector store...")
+        version = _save_vector_store(db, state=state)
+        logger.info(f"Vector store update complete (snapshot {version}).")
 
     if updated:
         save_ingestion_state(state)
         logger.info("Updated ingestion_state.json")
 
-        logger.info("Updating FAISS vector store...")
-        create_or_update_vector_store(all_new_chunks)
-        logger.info("Vector store update complete.")
+    return db, updated
+
+
+def main(progress=None):
+    session_id = generate_session_id()
+    logger = setup_logger(session_id)
+    logger.info(f"Starting ingestion session: {session_id}")
+
+    pdf_files = list_pdf_files(SOURCE_DIR)
+    if not pdf_files:
+        logger.warning("No PDF files found in source directory.")
+        return
+
+    session_dir = os.path.join(PROCESSED_DIR, session_id)
+    os.makedirs(session_dir, exist_ok=True)
+
+    # Another ingestion (UI job, watcher, rebuild) may be running in another process
+    with index_write_lock():
+        state = load_ingestion_state()
+        ingest_changes(pdf_files, [], state, session_id, session_dir, logger, progress=progress)
 
     logger.info("Ingestion session complete.")
 
@@ -0,0 +1,111 @@
+import uuid
+import queue
+import threading
+from datetime import datetime
+from config.configs import INGESTION_JOB_HISTORY
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class IngestionJobQueue:
+    """
+    Runs ingestion jobs one at a time on a background worker thread.
+
+    Submitting while a job is still queued returns that job's ID instead of adding
+    another one, so repeated clicks and reruns coalesce into a single run. Submitting
+    while a job is running queues exactly one follow-up job to pick up new files.
+    """
+
+    def __init__(self, run_ingestion=None, history=INGESTION_JOB_HISTORY):
+        self._run_ingestion = run_ingestion
+        self._history = history
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._queued_job_id = None
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self):
+        """Queues an ingestion of SOURCE_DIR and returns its job ID."""
+        with self._lock:
+            if self._queued_job_id is not None:
+                self._jobs[self._queued_job_id]["coalesced"] += 1
+                return self._queued_job_id
+
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "submitted_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "coalesced": 0,
+                "files_total": 0,
+                "files_done": 0,
+                "current_file": None,
+                "pages": 0,
+                "chunks": 0,
+                "error": None,
+            }
+            self._queued_job_id = job_id
+            self._queue.put(job_id)
+            self._ensure_worker()
+            return job_id
+
+    def get_status(self, job_id):
+        """Returns a snapshot of the job's status dict, or None for an unknown job."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._work, name="ingestion-worker", daemon=True)
+            self._worker.start()
+
+    def _update(self, job_id, fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j["status"] in (COMPLETED, FAILED)]
+        finished.sort(key=lambda j: j["finished_at"])
+        for job in finished[:max(0, len(finished) - self._history)]:
+            del self._jobs[job["job_id"]]
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                if self._queued_job_id == job_id:
+                    self._queued_job_id = None
+                self._jobs[job_id].update(status=RUNNING, started_at=datetime.now().isoformat())
+
+            result = {"status": COMPLETED}
+            try:
+                run_ingestion = self._run_ingestion
+                if run_ingestion is None:
+                    from ingestion.ingest import main as run_ingestion
+                run_ingestion(progress=lambda fields: self._update(job_id, fields))
+            except Exception as e:
+                result = {"status": FAILED, "error": str(e)}
+
+            with self._lock:
+                self._jobs[job_id].update(result, finished_at=datetime.now().isoformat())
+                self._prune()
+            self._queue.task_done()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Returns the process-wide ingestion job queue, shared by every UI session."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = IngestionJobQueue()
+        return _job_queue
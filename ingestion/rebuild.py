@@ -0,0 +1,212 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import generate_session_id, setup_logger
+from utils.chunk_store import ChunkStore
+from utils.index_snapshots import index_write_lock
+from utils.dedup import NearDuplicateDetector, format_dedup_stats
+from utils.exceptions import IngestionError
+from utils.metadata_tracker import load_ingestion_state
+from utils.vector_store import (
+    build_vector_store_from_embeddings,
+    load_vector_store,
+    _get_embedding_model,
+    _save_vector_store,
+    _vector_store_exists,
+)
+from ingestion.ingest import generate_doc_id
+from config.configs import (
+    DEDUP_ENABLED,
+    PROCESSED_DIR,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MODEL_NAME,
+    VECTOR_STORE_DISTANCE,
+)
+
+def _batches(chunks, batch_size):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _prefetch(pool, fn, items, depth):
+    """Like pool.map(fn, items), but with at most `depth` results pending at a time."""
+    pending = []
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= depth:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+def _chunk_order(metadata):
+    match = re.search(r"_ch(\d+)$", metadata.get("chunk_id") or "")
+    return metadata.get("page_num") or 0, int(match.group(1)) if match else 0
+
+def _chunks_from_processed_data(filename, record):
+    """The chunks saved by the ingestion session that processed this file, if still on disk."""
+    from langchain.docstore.document import Document
+
+    path = os.path.join(PROCESSED_DIR, record.get("session_id", ""), f"{generate_doc_id(filename)}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return [Document(page_content=c["page_content"], metadata=c["metadata"]) for c in json.load(f)]
+
+def _chunks_from_index(doc_ids):
+    """
+    Recovers the chunks of doc_ids from the published index: their own canonical chunks,
+    plus their near-duplicates, which take the text of the canonical chunk they were
+    merged into. Returns {doc_id: [Document]} in page / chunk order.
+    """
+    from langchain.docstore.document import Document
+
+    chunks = {doc_id: [] for doc_id in doc_ids}
+    if not _vector_store_exists():
+        return chunks
+    for doc in load_vector_store().docstore._dict.values():
+        metadata = {k: v for k, v in doc.metadata.items() if k != "duplicates"}
+        for location in [metadata] + doc.metadata.get("duplicates", []):
+            if location.get("doc_id") in chunks:
+                chunks[location["doc_id"]].append(
+                    Document(page_content=doc.page_content, metadata={**metadata, **location})
+                )
+    for documents in chunks.values():
+        documents.sort(key=lambda d: _chunk_order(d.metadata))
+    return chunks
+
+def backfill_chunk_store(store, state, logger):
+    """
+    Writes manifests for ingested files that predate the chunk store, from the session's
+    processed_data JSON when it still exists, else from the published index. Returns
+    the files that could not be backfilled.
+    """
+    stored = set(store.list_documents())
+    missing = {f: generate_doc_id(f) for f in state if generate_doc_id(f) not in stored}
+    if not missing:
+        return []
+
+    from_index = None
+    for filename, doc_id in sorted(missing.items()):
+        chunks = _chunks_from_processed_data(filename, state[filename])
+        source = "processed data"
+        if chunks is None:
+            if from_index is None:
+                from_index = _chunks_from_index(set(missing.values()))
+            chunks, source = from_index[doc_id], "index"
+        if not chunks:
+            continue
+        for _ in store.record_document(doc_id, chunks):
+            pass
+        logger.info(f"Backfilled chunk store for {filename}: {len(chunks)} chunks from {source}")
+
+    stored = set(store.list_documents())
+    return sorted(f for f, doc_id in missing.items() if doc_id not in stored)
+
+def rebuild_index(workers=4, distance=VECTOR_STORE_DISTANCE, dedup=DEDUP_ENABLED,
+                  batch_size=EMBEDDING_BATCH_SIZE, allow_missing=False, logger=None):
+    """
+    Regenerates the vector index from the chunk store only (no PDFs, no PyMuPDF),
+    using the configured EMBEDDING_MODEL_NAME and the given distance. Documents are
+    read and batches embedded in parallel on `workers` threads with a bounded number
+    of results in flight, so memory stays bounded. Near-duplicate detection is re-run
+    from scratch. Publishes and returns the new index; holds the index writer lock
+    throughout, so ingestion runs wait for the rebuild instead of being overwritten.
+
+    Files ingested before the chunk store existed are backfilled first. If some still
+    have no chunks, raises IngestionError instead of publishing a smaller index,
+    unless allow_missing is set.
+    """
+    logger = logger or setup_logger(generate_session_id())
+    with index_write_lock():
+        return _rebuild_index(workers, distance, dedup, batch_size, allow_missing, logger)
+
+def _rebuild_index(workers, distance, dedup, batch_size, allow_missing, logger):
+    start = time.perf_counter()
+    store = ChunkStore()
+    missing = backfill_chunk_store(store, load_ingestion_state(), logger)
+    if missing and not allow_missing:
+        raise IngestionError(
+            f"{len(missing)} ingested files have no chunks in the chunk store: {missing}. "
+            f"Re-ingest them, or pass allow_missing / --allow-missing to rebuild without them."
+        )
+    if missing:
+        logger.warning(f"{len(missing)} ingested files have no chunk store entry and will be missing: {missing}")
+    doc_ids = store.list_documents()
+
+    embeddings = _get_embedding_model()
+    detector = NearDuplicateDetector() if dedup else None
+    dedup_stats = {}
+    db = None
+    num_chunks = 0
+
+    def _embed(batch):
+        return batch, embeddings.embed_documents([c.page_content for c in batch])
+
+    with ThreadPoolExecutor(max_workers=workers) as loaders, ThreadPoolExecutor(max_workers=workers) as embedders:
+        documents = _prefetch(loaders, store.load_document, doc_ids, depth=workers)
+        chunks = (chunk for document in documents for chunk in document)
+        if detector is not None:
+            chunks = detector.filter_duplicates(chunks, dedup_stats)
+
+        for batch, vectors in _prefetch(embedders, _embed, _batches(chunks, batch_size), depth=2 * workers):
+            db = build_vector_store_from_embeddings(
+                [c.page_content for c in batch], vectors, [c.metadata for c in batch],
+                embeddings, db=db, distance=distance,
+            )
+            num_chunks += len(batch)
+
+    if db is None:
+        logger.warning("Chunk store is empty; nothing to rebuild.")
+        return None
+
+    if detector is not None:
+        detector.apply_pending_refs(db)
+        detector.save()
+        logger.info(format_dedup_stats(dedup_stats))
+
+    version = _save_vector_store(db)
+    logger.info(
+        f"Rebuilt index (snapshot {version}) from {len(doc_ids)} documents / {num_chunks} chunks "
+        f"({EMBEDDING_MODEL_NAME}, {distance}) in {time.perf_counter() - start:.1f}s"
+    )
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector index from the chunk store.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--distance", choices=["cosine", "l2"], default=VECTOR_STORE_DISTANCE)
+    parser.add_argument("--no-dedup", action="store_true", help="Embed near-duplicate chunks too")
+    parser.add_argument("--gc", action="store_true", help="Delete chunk objects no document references")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="Publish even if some ingested files have no chunks in the chunk store")
+    args = parser.parse_args()
+
+    logger = setup_logger(generate_session_id())
+    if args.gc:
+        with index_write_lock():
+            logger.info(f"Removed {ChunkStore().gc()} unreferenced chunk objects.")
+    try:
+        rebuild_index(
+            workers=args.workers,
+            distance=args.distance,
+            dedup=DEDUP_ENABLED and not args.no_dedup,
+            allow_missing=args.allow_missing,
+            logger=logger,
+        )
+    except IngestionError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import argparse
+from utils.logger import generate_session_id, setup_logger
+from utils.index_snapshots import (
+    current_version,
+    gc_snapshots,
+    index_write_lock,
+    list_versions,
+    rollback,
+    snapshot_path,
+)
+from config.configs import SNAPSHOTS_TO_KEEP
+
+def _snapshot_size(version):
+    path = snapshot_path(version)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def main():
+    parser = argparse.ArgumentParser(description="List, roll back and garbage-collect index snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show the snapshots, oldest first")
+    rollback_parser = commands.add_parser("rollback", help="Make an earlier snapshot current")
+    rollback_parser.add_argument("version", nargs="?", help="Defaults to the one before the current snapshot")
+    gc_parser = commands.add_parser("gc", help="Delete old snapshots")
+    gc_parser.add_argument("--keep", type=int, default=SNAPSHOTS_TO_KEEP)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = current_version()
+        for version in list_versions():
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  {_snapshot_size(version) / 1024 / 1024:.1f} MB")
+        return
+
+    logger = setup_logger(generate_session_id())
+    with index_write_lock():
+        if args.command == "rollback":
+            previous = current_version()
+            logger.info(f"Rolled back index from {previous} to {rollback(args.version)}")
+        else:
+            removed = gc_snapshots(keep=max(args.keep, 1))
+            logger.info(f"Removed {len(removed)} old snapshots: {removed}")
+
+
+if __name__ == "__main__":
+    main()
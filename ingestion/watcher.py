@@ -0,0 +1,265 @@
+import os
+import time
+import argparse
+import threading
+from utils.logger import generate_session_id, setup_logger
+from utils.metadata_tracker import load_ingestion_state
+from utils.index_snapshots import index_write_lock
+from utils.vector_store import get_index_version, load_vector_store, _vector_store_exists
+from ingestion.ingest import ingest_changes
+from config.configs import (
+    SOURCE_DIR,
+    PROCESSED_DIR,
+    WATCH_DEBOUNCE_SECONDS,
+    WATCH_MAX_DELAY_SECONDS,
+    WATCH_POLL_INTERVAL_SECONDS,
+    WATCH_RETRY_BACKOFF_SECONDS,
+    WATCH_RETRY_MAX_BACKOFF_SECONDS,
+)
+
+def _is_pdf(path):
+    return path.lower().endswith(".pdf")
+
+def _snapshot(folder_path):
+    """Returns {filename: (mtime_ns, size)} for the PDFs in folder_path (stat only, no hashing)."""
+    snapshot = {}
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_file() and _is_pdf(entry.name):
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+
+class _PollingWatcher:
+    """Fallback watcher: compares directory snapshots every poll_interval seconds."""
+
+    def __init__(self, folder_path, on_change, poll_interval=WATCH_POLL_INTERVAL_SECONDS):
+        self.folder_path = folder_path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ingest-poller", daemon=True)
+
+    def _run(self):
+        previous = _snapshot(self.folder_path)
+        while not self._stop.wait(self.poll_interval):
+            current = _snapshot(self.folder_path)
+            for name in previous.keys() | current.keys():
+                if previous.get(name) != current.get(name):
+                    self.on_change(name)
+            previous = current
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        self._thread.join()
+
+
+def _create_watchdog_watcher(folder_path, on_change):
+    """Returns a watchdog observer (inotify on Linux), or None if watchdog is not installed."""
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None
+
+    # Ignore "opened"/"closed_no_write": reading a file while hashing it must not re-trigger ingestion
+    relevant_events = {"created", "modified", "deleted", "moved", "closed"}
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.is_directory or event.event_type not in relevant_events:
+                return
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path and _is_pdf(path) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(folder_path):
+                    on_change(os.path.basename(path))
+
+    observer = Observer()
+    observer.schedule(_Handler(), folder_path, recursive=False)
+    return observer
+
+
+class IngestionDaemon:
+    """
+    Watches SOURCE_DIR and incrementally ingests added, changed and deleted PDFs.
+
+    File events are debounced: a batch is published once no new event arrived for
+    `debounce` seconds, or `max_delay` seconds after the first pending event,
+    whichever comes first. Each batch is a single vector store update. A batch that
+    fails (e.g. IndexLockError while another ingestion holds the writer lock) is put
+    back and retried with exponential backoff.
+    """
+
+    def __init__(self, source_dir=SOURCE_DIR, debounce=WATCH_DEBOUNCE_SECONDS,
+                 max_delay=WATCH_MAX_DELAY_SECONDS, poll_interval=WATCH_POLL_INTERVAL_SECONDS,
+                 use_inotify=True, retry_backoff=WATCH_RETRY_BACKOFF_SECONDS,
+                 max_retry_backoff=WATCH_RETRY_MAX_BACKOFF_SECONDS, logger=None):
+        self.session_id = generate_session_id()
+        self.logger = logger or setup_logger(self.session_id)
+        self.source_dir = source_dir
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+        self._pending = set()
+        self._first_event = None
+        self._last_event = None
+        self._retry_at = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._db = None
+        self._db_version = None
+
+    def _on_change(self, filename):
+        with self._lock:
+            now = time.monotonic()
+            self._pending.add(filename)
+            self._last_event = now
+            if self._first_event is None:
+                self._first_event = now
+        self._wakeup.set()
+
+    def _take_batch(self):
+        """Returns the pending filenames once the debounce window has elapsed, else None."""
+        with self._lock:
+            if not self._pending:
+                return None
+            now = time.monotonic()
+            if self._retry_at is not None and now < self._retry_at:
+                return None
+            if now - self._last_event < self.debounce and now - self._first_event < self.max_delay:
+                return None
+            batch, self._pending = self._pending, set()
+            self._first_event = self._last_event = None
+            return batch
+
+    def _get_db(self):
+        # Keep the index in memory between batches; reload only if someone else saved it
+        version = get_index_version()
+        if self._db is None or version != self._db_version:
+            self._db = load_vector_store() if _vector_store_exists() else None
+            self._db_version = version
+        return self._db
+
+    def _retry_later(self, batch):
+        """Puts a failed batch back into the pending set, to be retried after a backoff."""
+        self._failures += 1
+        delay = min(self.retry_backoff * 2 ** (self._failures - 1), self.max_retry_backoff)
+        with self._lock:
+            now = time.monotonic()
+            self._pending |= set(batch)
+            self._first_event = self._last_event = now
+            self._retry_at = now + delay
+        self.logger.warning(f"Retrying {len(batch)} files in {delay:.1f}s (attempt {self._failures + 1})")
+
+    def _process_or_retry(self, batch):
+        try:
+            self.process(batch)
+        except Exception:
+            self.logger.exception("Failed to process batch.")
+            self._db = None  # may hold changes that were never published
+            self._retry_later(batch)
+        else:
+            self._failures = 0
+            self._retry_at = None
+
+    def process(self, filenames):
+        changed = sorted(f for f in filenames if os.path.exists(os.path.join(self.source_dir, f)))
+        deleted = sorted(f for f in filenames if f not in changed)
+        self.logger.info(f"Processing batch: {len(changed)} added/changed, {len(deleted)} deleted")
+
+        session_dir = os.path.join(PROCESSED_DIR, self.session_id)
+        os.makedirs(session_dir, exist_ok=True)
+
+        start = time.perf_counter()
+        with index_write_lock():
+            state = load_ingestion_state()
+            db, updated = ingest_changes(
+                changed, deleted, state, self.session_id, session_dir, self.logger,
+                db=self._get_db(), source_dir=self.source_dir,
+            )
+            if updated:
+                self._db = db
+                self._db_version = get_index_version()
+        if updated:
+            self.logger.info(f"Published batch in {time.perf_counter() - start:.2f}s")
+
+    def _reconcile_batch(self):
+        on_disk = set(_snapshot(self.source_dir))
+        known = set(load_ingestion_state())
+        # Known files are re-hashed once here; is_already_ingested skips the unchanged ones
+        return on_disk | (known - on_disk)
+
+    def reconcile(self):
+        """Catches up with changes made while the daemon was not running."""
+        self.process(self._reconcile_batch())
+
+    def _start_watcher(self):
+        watcher = _create_watchdog_watcher(self.source_dir, self._on_change) if self.use_inotify else None
+        if watcher is not None:
+            self.logger.info(f"Watching {self.source_dir} (watchdog)")
+        else:
+            watcher = _PollingWatcher(self.source_dir, self._on_change, self.poll_interval)
+            self.logger.info(f"Watching {self.source_dir} (polling every {self.poll_interval}s)")
+        watcher.start()
+        return watcher
+
+    def run(self):
+        os.makedirs(self.source_dir, exist_ok=True)
+        self._watcher = self._start_watcher()
+        try:
+            self._process_or_retry(self._reconcile_batch())
+            while not self._stop.is_set():
+                self._wakeup.wait(timeout=min(self.debounce, 0.5))
+                self._wakeup.clear()
+                batch = self._take_batch()
+                if batch:
+                    self._process_or_retry(batch)
+        finally:
+            self._watcher.stop()
+            self._watcher.join()
+            self.logger.info("Ingestion daemon stopped.")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch SOURCE_DIR and ingest changes incrementally.")
+    parser.add_argument("--source-dir", default=SOURCE_DIR)
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS)
+    parser.add_argument("--max-delay", type=float, default=WATCH_MAX_DELAY_SECONDS)
+    parser.add_argument("--poll-interval", type=float, default=WATCH_POLL_INTERVAL_SECONDS)
+    parser.add_argument("--polling", action="store_true", help="Use the polling watcher even if watchdog is installed")
+    args = parser.parse_args()
+
+    daemon = IngestionDaemon(
+        source_dir=args.source_dir,
+        debounce=args.debounce,
+        max_delay=args.max_delay,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.polling,
+    )
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,11 @@ from utils.exceptions import (
     DocumentProcessingError, 
     SessionInitializationError,
 )
-from ingestion.ingest import main as ingest_main
+from utils.warmup import preload_heavy_modules
+from chat.retriever import warm_query_cache
 from config.configs import SOURCE_DIR
 import logging
+import time
 
 # Initialize logging
 if "session_id" not in st.session_state:
@@ -20,6 +22,9 @@ except Exception as e:
     st.error(f"Failed to initialize logging: {str(e)}")
     st.stop()
 
+# Import the LLM, embedding and ingestion stacks in the background while the page renders
+preload_heavy_modules(logger=logger)
+
 PROMPT_TEMPLATES = [
     {
         "title": "Statement Modification",
@@ -35,6 +40,9 @@ PROMPT_TEMPLATES = [
     }
 ]
 
+# Precompute retrieval for the templates in the background (once per index version)
+warm_query_cache([template["prompt"] for template in PROMPT_TEMPLATES], logger=logger)
+
 # Initialize session state
 def init_session_state():
     """Initialize all session state variables with error handling"""
@@ -109,27 +117,55 @@ try:
             logger.info(f"Received {len(uploaded_files)} files for upload")
             
             if st.button("Process Documents", type="primary"):
-                with st.spinner("Processing..."):
-                    try:
-                        for file in uploaded_files:
-                            file_path = os.path.join(SOURCE_DIR, file.name)
-                            logger.info(f"Processing file: {file.name}")
-                            
-                            try:
-                                with open(file_path, "wb") as f:
-                                    f.write(file.getbuffer())
-                                logger.debug(f"Saved file: {file_path}")
-                            except IOError as e:
-                                logger.error(f"Failed to save file {file.name}: {str(e)}")
-                                raise DocumentProcessingError(f"Failed to save {file.name}: {str(e)}")
-                                
-                        ingest_main()
-                        logger.info("Document processing completed successfully")
-                        st.success("Documents processed successfully!")
-                        
-                    except Exception as e:
-                        logger.error(f"Document processing error: {str(e)}")
-                        st.error(f"Error processing documents: {str(e)}")
+                try:
+                    for file in uploaded_files:
+                        file_path = os.path.join(SOURCE_DIR, file.name)
+                        logger.info(f"Processing file: {file.name}")
+
+                        try:
+                            # Write then rename, so a running ingestion never reads a partial file
+                            tmp_path = f"{file_path}.part"
+                            with open(tmp_path, "wb") as f:
+                                f.write(file.getbuffer())
+                            os.replace(tmp_path, file_path)
+                            logger.debug(f"Saved file: {file_path}")
+                        except IOError as e:
+                            logger.error(f"Failed to save file {file.name}: {str(e)}")
+                            raise DocumentProcessingError(f"Failed to save {file.name}: {str(e)}")
+
+                    from ingestion.jobs import get_job_queue
+                    st.session_state.ingestion_job_id = get_job_queue().submit()
+                    logger.info(f"Submitted ingestion job: {st.session_state.ingestion_job_id}")
+
+                except Exception as e:
+                    logger.error(f"Document processing error: {str(e)}")
+                    st.error(f"Error processing documents: {str(e)}")
+
+        # Ingestion job status (runs in the background; this page polls it)
+        if st.session_state.get("ingestion_job_id"):
+            from ingestion.jobs import get_job_queue, QUEUED, RUNNING, COMPLETED
+            job = get_job_queue().get_status(st.session_state.ingestion_job_id)
+
+            if job is None:
+                st.session_state.ingestion_job_id = None
+            elif job["status"] == QUEUED:
+                st.info(f"Ingestion job {job['job_id']} is queued...")
+            elif job["status"] == RUNNING:
+                files_total = max(job["files_total"], 1)
+                st.progress(min(job["files_done"] / files_total, 1.0))
+                st.caption(
+                    f"Job {job['job_id']}: file {min(job['files_done'] + 1, files_total)} of {files_total}"
+                    f" ({job['current_file'] or '-'}), page {job['pages']}, {job['chunks']} chunks"
+                )
+            elif job["status"] == COMPLETED:
+                st.success("Documents processed successfully!")
+            else:
+                logger.error(f"Ingestion job {job['job_id']} failed: {job['error']}")
+                st.error(f"Error processing documents: {job['error']}")
+
+            if job is not None and job["status"] in (QUEUED, RUNNING):
+                time.sleep(1)
+                st.rerun()
 
     else:  # Chat interface
         st.header("Internal Document Assistant")
@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+from config.configs import CHUNK_STORE_DIR
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkStore:
+    """
+    Durable, content-addressed store of processed chunks.
+
+    objects/<h[:2]>/<h>.json holds the text of a chunk, addressed by the sha256 of
+    its content (identical text across documents is stored once).
+    manifests/<doc_id>.json lists a document's chunks in order as {"hash", "metadata"}.
+
+    Unlike the per-session processed_data directories, nothing here is pruned:
+    a manifest lives until its document is deleted, and gc() removes objects no
+    manifest references any more. The vector index can be rebuilt from this store
+    alone (see ingestion/rebuild.py).
+    """
+
+    def __init__(self, root=CHUNK_STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json")
+
+    def _manifest_path(self, doc_id):
+        return os.path.join(self.manifests_dir, f"{doc_id}.json")
+
+    # --- Writing ---
+
+    def put_text(self, text: str) -> str:
+        digest = content_hash(text)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"page_content": text}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        return digest
+
+    def record_document(self, doc_id, chunks):
+        """
+        Passes a chunk stream through unchanged while storing every chunk. The
+        manifest is published only once the stream is exhausted, so a document
+        that fails half-way keeps its previous manifest.
+        """
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        path = self._manifest_path(doc_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(f'{{"doc_id": {json.dumps(doc_id)}, "chunks": [')
+                for i, chunk in enumerate(chunks):
+                    entry = {"hash": self.put_text(chunk.page_content), "metadata": chunk.metadata}
+                    f.write(("," if i else "") + "\n" + json.dumps(entry, ensure_ascii=False, default=str))
+                    yield chunk
+                f.write("\n]}")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def remove_document(self, doc_id):
+        try:
+            os.remove(self._manifest_path(doc_id))
+        except FileNotFoundError:
+            pass
+
+    def gc(self):
+        """Deletes objects no manifest references. Returns the number removed."""
+        referenced = set()
+        for doc_id in self.list_documents():
+            referenced.update(entry["hash"] for entry in self._read_manifest(doc_id)["chunks"])
+
+        removed = 0
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                if name.endswith(".json") and name[:-5] not in referenced:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+    # --- Reading ---
+
+    def list_documents(self):
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.manifests_dir) if name.endswith(".json"))
+
+    def _read_manifest(self, doc_id):
+        with open(self._manifest_path(doc_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_text(self, digest):
+        with open(self._object_path(digest), "r", encoding="utf-8") as f:
+            return json.load(f)["page_content"]
+
+    def load_document(self, doc_id):
+        """Returns a document's chunks as langchain Documents, in ingestion order."""
+        from langchain.docstore.document import Document
+
+        return [
+            Document(page_content=self.get_text(entry["hash"]), metadata=entry["metadata"])
+            for entry in self._read_manifest(doc_id)["chunks"]
+        ]
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import hashlib
+from collections import defaultdict
+from config.configs import (
+    DEDUP_INDEX_FILE,
+    DEDUP_NUM_PERM,
+    DEDUP_BANDS,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_THRESHOLD,
+)
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def _shingle_hashes(text, shingle_size):
+    words = text.lower().split()
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") % _MERSENNE_PRIME
+        for s in shingles
+    ]
+
+
+class NearDuplicateDetector:
+    """
+    MinHash + LSH near-duplicate detector for chunks.
+
+    Each chunk gets a MinHash signature over its word shingles. Signatures are split
+    into `bands` bands; chunks sharing a band are candidates, and a candidate is a
+    duplicate when the estimated Jaccard similarity is >= threshold. The first chunk
+    of a cluster is the canonical one; later members are recorded as back-references
+    ({"doc_id", "page_num", "chunk_id", "source"}) under the canonical's chunk_id.
+    """
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, bands=DEDUP_BANDS,
+                 shingle_size=DEDUP_SHINGLE_SIZE, threshold=DEDUP_THRESHOLD):
+        import numpy as np
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.signatures = {}              # canonical chunk_id -> (doc_id, signature)
+        self.buckets = defaultdict(set)   # (band, band hash) -> canonical chunk_ids
+        self.pending_refs = defaultdict(list)  # canonical chunk_id -> new back-references
+        self.released_docs = set()  # doc_ids whose old back-references are still in db
+
+    # --- Signatures ---
+
+    def signature(self, text):
+        import numpy as np
+
+        hashes = _shingle_hashes(text, self.shingle_size)
+        if not hashes:
+            return None
+        h = np.array(hashes, dtype=np.uint64)
+        permuted = (self._a[:, None] * h[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature):
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def find_duplicate(self, signature):
+        """Returns the chunk_id of the most similar canonical chunk above threshold, or None."""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+
+        best, best_score = None, self.threshold
+        for chunk_id in candidates:
+            score = float((self.signatures[chunk_id][1] == signature).mean())
+            if score >= best_score:
+                best, best_score = chunk_id, score
+        return best
+
+    def add(self, chunk_id, doc_id, signature):
+        self.signatures[chunk_id] = (doc_id, signature)
+        for key in self._band_keys(signature):
+            self.buckets[key].add(chunk_id)
+
+    def remove(self, chunk_id):
+        entry = self.signatures.pop(chunk_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry[1]):
+            self.buckets[key].discard(chunk_id)
+            if not self.buckets[key]:
+                del self.buckets[key]
+
+    # --- Ingestion ---
+
+    def filter_duplicates(self, chunks, stats):
+        """
+        Yields only the canonical chunks of a chunk stream. Near-duplicates are
+        recorded in pending_refs; stats["chunks"] / stats["duplicates"] / stats["seconds"]
+        are updated as the stream is consumed.
+        """
+        for chunk in chunks:
+            start = time.perf_counter()
+            signature = self.signature(chunk.page_content)
+            canonical = self.find_duplicate(signature) if signature is not None else None
+            if canonical is None and signature is not None:
+                self.add(chunk.metadata["chunk_id"], chunk.metadata["doc_id"], signature)
+            elif canonical is not None:
+                self.pending_refs[canonical].append(_reference(chunk.metadata))
+            stats["seconds"] = stats.get("seconds", 0.0) + time.perf_counter() - start
+            stats["chunks"] = stats.get("chunks", 0) + 1
+
+            if canonical is None:
+                yield chunk
+            else:
+                stats["duplicates"] = stats.get("duplicates", 0) + 1
+
+    def apply_pending_refs(self, db):
+        """
+        Drops back-references into documents released since the last call, then appends
+        the recorded back-references to the canonical chunks' metadata in db. Scans the
+        docstore once; call it once per ingestion batch.
+        """
+        if not self.pending_refs and not self.released_docs:
+            return
+        for doc in db.docstore._dict.values():
+            refs = self.pending_refs.get(doc.metadata.get("chunk_id"), [])
+            if "duplicates" in doc.metadata and self.released_docs:
+                doc.metadata["duplicates"] = [
+                    r for r in doc.metadata["duplicates"] if r["doc_id"] not in self.released_docs
+                ]
+            if refs:
+                doc.metadata["duplicates"] = doc.metadata.get("duplicates", []) + refs
+        self.pending_refs.clear()
+        self.released_docs.clear()
+
+    def detach_doc(self, doc_id):
+        """
+        Hides a document that is about to be replaced or deleted: its signatures leave
+        the LSH buckets (the new version must not be deduplicated against the old one),
+        and back-references recorded this run for its canonicals, or pointing into its
+        old chunks, are set aside. Does not touch db. Returns a handle for
+        restore_doc() / release_doc().
+        """
+        detached = {"signatures": {}, "refs": {}, "dropped": []}
+        for chunk_id in [c for c, (d, _) in self.signatures.items() if d == doc_id]:
+            detached["signatures"][chunk_id] = self.signatures[chunk_id][1]
+            self.remove(chunk_id)
+            if chunk_id in self.pending_refs:
+                detached["refs"][chunk_id] = self.pending_refs.pop(chunk_id)
+        # The new version has not been read yet, so these all point into the old one
+        for chunk_id, refs in self.pending_refs.items():
+            detached["dropped"] += [(chunk_id, r) for r in refs if r["doc_id"] == doc_id]
+            refs[:] = [r for r in refs if r["doc_id"] != doc_id]
+        return detached
+
+    def restore_doc(self, doc_id, detached):
+        """Undoes detach_doc() after a failed replacement, dropping what the attempt recorded."""
+        for chunk_id in [c for c, (d, _) in self.signatures.items() if d == doc_id]:
+            self.remove(chunk_id)
+        for refs in self.pending_refs.values():
+            refs[:] = [r for r in refs if r["doc_id"] != doc_id]
+        for chunk_id, signature in detached["signatures"].items():
+            self.add(chunk_id, doc_id, signature)
+        for chunk_id, refs in detached["refs"].items():
+            self.pending_refs[chunk_id].extend(refs)
+        for chunk_id, ref in detached["dropped"]:
+            self.pending_refs[chunk_id].append(ref)
+
+    def release_doc(self, db, doc_id, store_ids, detached):
+        """
+        Forgets the old version of a document once its replacement is in db (or it was
+        deleted). Only its chunks (store_ids) are visited. A canonical chunk that other
+        documents still reference hands those references to a matching canonical if
+        there is one (typically the same text in the new version), else it is promoted
+        to one of the references so the shared vector survives under it. Back-references
+        into the document elsewhere in db are dropped by the next apply_pending_refs().
+        Returns {store_id: new doc_id} for the promoted chunks, which the caller must keep.
+        """
+        promoted = {}
+        for store_id in store_ids:
+            doc = db.docstore.search(store_id)
+            chunk_id = doc.metadata.get("chunk_id")
+            refs = [
+                r for r in doc.metadata.get("duplicates", [])
+                if r["doc_id"] != doc_id and r["doc_id"] not in self.released_docs
+            ] + detached["refs"].get(chunk_id, [])
+            if not refs:
+                continue
+            signature = detached["signatures"].get(chunk_id)
+            match = self.find_duplicate(signature) if signature is not None else None
+            if match is not None:
+                self.pending_refs[match].extend(refs)
+                continue
+            # Remaining references stay pending so apply_pending_refs() adds them after
+            # dropping references into released documents
+            target = refs.pop(0)
+            doc.metadata.update(target)
+            doc.metadata["duplicates"] = []
+            self.pending_refs[target["chunk_id"]].extend(refs)
+            if signature is not None:
+                self.add(target["chunk_id"], target["doc_id"], signature)
+            promoted[store_id] = target["doc_id"]
+        self.released_docs.add(doc_id)
+        return promoted
+
+    # --- Persistence ---
+
+    def save(self, path=DEDUP_INDEX_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "signatures": {c: [d, s.astype("<u4").tobytes().hex()] for c, (d, s) in self.signatures.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEDUP_INDEX_FILE):
+        """Loads the persisted detector; returns an empty one if missing or built with other parameters."""
+        import numpy as np
+
+        detector = cls()
+        if not os.path.exists(path):
+            return detector
+        with open(path, "r") as f:
+            data = json.load(f)
+        params = (data.get("num_perm"), data.get("bands"), data.get("shingle_size"))
+        if params != (detector.num_perm, detector.bands, detector.shingle_size):
+            return detector
+        for chunk_id, (doc_id, hex_signature) in data["signatures"].items():
+            signature = np.frombuffer(bytes.fromhex(hex_signature), dtype="<u4").astype(np.uint64)
+            detector.add(chunk_id, doc_id, signature)
+        return detector
+
+
+def _reference(metadata):
+    return {key: metadata.get(key) for key in ("doc_id", "page_num", "chunk_id", "source")}
+
+def format_dedup_stats(stats):
+    total = stats.get("chunks", 0)
+    duplicates = stats.get("duplicates", 0)
+    reduction = duplicates / total if total else 0.0
+    return (
+        f"Near-duplicate elimination: skipped {duplicates} of {total} chunks "
+        f"({reduction:.1%} smaller index), overhead {stats.get('seconds', 0.0):.2f}s"
+    )
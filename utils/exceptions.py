@@ -25,3 +25,11 @@ class RetrievalError(RAGException):
 class ConfigurationError(RAGException):
     """Exception raised when configuration is invalid."""
     pass
+
+class LLMCacheMissError(RAGException):
+    """Exception raised when replay mode finds no cached LLM response."""
+    pass
+
+class IndexLockError(RAGException):
+    """Exception raised when the index writer lock cannot be acquired."""
+    pass
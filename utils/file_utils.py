@@ -4,6 +4,9 @@ import hashlib
 def list_pdf_files(folder_path):
     return [f for f in os.listdir(folder_path) if f.lower().endswith(".pdf")]
 
-def calculate_file_md5(file_path):
+def calculate_file_md5(file_path, block_size=1024 * 1024):
+    md5 = hashlib.md5()
     with open(file_path, "rb") as f:
-        return hashlib.md5(f.read()).hexdigest()
+        for block in iter(lambda: f.read(block_size), b""):
+            md5.update(block)
+    return md5.hexdigest()
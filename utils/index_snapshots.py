@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import uuid
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from utils.exceptions import IndexLockError
+from config.configs import (
+    VECTOR_STORE_DIR,
+    STATE_FILE,
+    DEDUP_INDEX_FILE,
+    SNAPSHOTS_TO_KEEP,
+    INDEX_LOCK_TIMEOUT_SECONDS,
+)
+
+# Layout of VECTOR_STORE_DIR:
+#   snapshots/<version>/  index.faiss, index.pkl and the ingestion state / dedup index
+#                         they were published with; never modified once published
+#   CURRENT               name of the published version, swapped with os.replace
+#   .write.lock           held by the single writer (ingestion, rebuild, rollback, gc)
+SNAPSHOTS_DIR = os.path.join(VECTOR_STORE_DIR, "snapshots")
+POINTER_FILE = os.path.join(VECTOR_STORE_DIR, "CURRENT")
+LOCK_FILE = os.path.join(VECTOR_STORE_DIR, ".write.lock")
+
+# Index files written by FAISS.save_local directly into VECTOR_STORE_DIR (before snapshots)
+LEGACY_FILES = ("index.faiss", "index.pkl")
+LEGACY_VERSION = "000000_legacy"
+
+_STATE_SIDECAR = "ingestion_state.json"
+_DEDUP_SIDECAR = "dedup_index.json"
+
+
+def new_version():
+    """
+    Returns <sequence>_<timestamp>_<uuid>; the zero-padded sequence makes versions sort
+    in publishing order. Only called with the writer lock held.
+    """
+    sequence = 1 + max((int(v.split("_", 1)[0]) for v in list_versions()), default=0)
+    return f"{sequence:06d}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+def snapshot_path(version):
+    return os.path.join(SNAPSHOTS_DIR, version)
+
+def current_version():
+    """Returns the published version, or None if no snapshot was published yet."""
+    try:
+        with open(POINTER_FILE, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def list_versions():
+    """Returns the complete snapshots, oldest first."""
+    if not os.path.isdir(SNAPSHOTS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(SNAPSHOTS_DIR)
+        if not name.endswith(".tmp") and os.path.isdir(os.path.join(SNAPSHOTS_DIR, name))
+    )
+
+def _fsync_dir(path):
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _set_pointer(version):
+    tmp_path = f"{POINTER_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, POINTER_FILE)
+    _fsync_dir(VECTOR_STORE_DIR)
+
+
+# --- Writer lock ---
+
+@contextmanager
+def index_write_lock(timeout=INDEX_LOCK_TIMEOUT_SECONDS):
+    """
+    Cross-process lock serializing everything that modifies the index: ingestion runs
+    (UI jobs, the watcher, CLI), rebuilds, rollback and gc. Readers never take it.
+    Waits up to `timeout` seconds (None waits forever), then raises IndexLockError.
+    The OS releases the lock if the holder dies.
+    """
+    os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+    f = open(LOCK_FILE, "a+")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while not _try_lock(f):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise IndexLockError(f"Timed out after {timeout}s waiting for the index writer lock ({LOCK_FILE}).")
+            time.sleep(0.1)
+        try:
+            yield
+        finally:
+            _unlock(f)
+    finally:
+        f.close()
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(f):
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(f):
+        # flock locks belong to the open file, so threads of one process exclude each other too
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# --- Publishing (writer lock held) ---
+
+def _migrate_legacy():
+    """Moves an index saved before snapshots existed into a snapshot of its own."""
+    legacy = [os.path.join(VECTOR_STORE_DIR, name) for name in LEGACY_FILES]
+    if current_version() is not None or not all(os.path.exists(p) for p in legacy):
+        return
+    target = snapshot_path(LEGACY_VERSION)
+    os.makedirs(target, exist_ok=True)
+    for path in legacy:
+        os.replace(path, os.path.join(target, os.path.basename(path)))
+    _set_pointer(LEGACY_VERSION)
+
+def publish_snapshot(vector_store, state=None):
+    """
+    Saves vector_store as a new snapshot and makes it current. Files are written to
+    snapshots/<version>.tmp, renamed once complete, and only then is CURRENT swapped,
+    so readers see either the previous version or the new one, never a partial index.
+    The ingestion state (`state`, or STATE_FILE) and the dedup index are saved with
+    the snapshot so rollback() can restore them. Old snapshots are then gc'd.
+    Returns the new version.
+    """
+    _migrate_legacy()
+    version = new_version()
+    tmp_dir = snapshot_path(f"{version}.tmp")
+    os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
+    vector_store.save_local(tmp_dir)
+
+    if state is None and os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+    if state is not None:
+        with open(os.path.join(tmp_dir, _STATE_SIDECAR), "w") as f:
+            json.dump(state, f, indent=2)
+    if os.path.exists(DEDUP_INDEX_FILE):
+        shutil.copyfile(DEDUP_INDEX_FILE, os.path.join(tmp_dir, _DEDUP_SIDECAR))
+
+    for name in os.listdir(tmp_dir):
+        with open(os.path.join(tmp_dir, name), "rb") as f:
+            os.fsync(f.fileno())
+    os.replace(tmp_dir, snapshot_path(version))
+    _fsync_dir(SNAPSHOTS_DIR)
+    _set_pointer(version)
+
+    gc_snapshots()
+    return version
+
+def gc_snapshots(keep=SNAPSHOTS_TO_KEEP):
+    """
+    Deletes all but the `keep` newest snapshots (the current one is always kept) and
+    leftovers of interrupted publishes. A process still serving a deleted version keeps
+    it in memory and picks up CURRENT on its next lookup. Returns the deleted versions.
+    """
+    current = current_version()
+    versions = list_versions()
+    doomed = [v for v in versions[:max(len(versions) - keep, 0)] if v != current]
+    if os.path.isdir(SNAPSHOTS_DIR):
+        doomed += [name for name in os.listdir(SNAPSHOTS_DIR) if name.endswith(".tmp")]
+    for version in doomed:
+        shutil.rmtree(snapshot_path(version), ignore_errors=True)
+    return doomed
+
+def rollback(version=None):
+    """
+    Makes an earlier snapshot current again: `version`, or the one published before
+    the current one. The ingestion state and dedup index saved with it are restored,
+    so the next ingestion run re-applies any source changes made since.
+    Returns the version now current.
+    """
+    current = current_version()
+    versions = list_versions()
+    if version is None:
+        older = [v for v in versions if current is None or v < current]
+        if not older:
+            raise ValueError("No earlier snapshot to roll back to.")
+        version = older[-1]
+    elif version not in versions:
+        raise ValueError(f"Unknown snapshot: {version}")
+
+    snapshot = snapshot_path(version)
+    for sidecar, target in ((_STATE_SIDECAR, STATE_FILE), (_DEDUP_SIDECAR, DEDUP_INDEX_FILE)):
+        source = os.path.join(snapshot, sidecar)
+        if os.path.exists(source):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, f"{target}.tmp")
+            os.replace(f"{target}.tmp", target)
+        elif os.path.exists(target):
+            os.remove(target)
+
+    _set_pointer(version)
+    return version
@@ -0,0 +1,105 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from config.configs import LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES
+
+def make_cache_key(model_name, temperature, messages, stop=None):
+    """
+    Key for an LLM call: (model, temperature, hash of the messages).
+    messages is a list of (role, content) pairs.
+    """
+    messages_hash = hashlib.sha256(
+        json.dumps([list(m) for m in messages], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    raw = json.dumps([model_name, float(temperature), messages_hash, stop or []])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    On-disk LLM response cache: one JSON file per key under cache_dir/<key[:2]>/.
+    Reads refresh the file's mtime; when the cache grows past max_bytes the least
+    recently used entries are deleted until it is back under 90% of the limit.
+    """
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size = None  # computed lazily on the first write
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return record
+
+    def put(self, key, record):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({**record, "created_at": datetime.now().isoformat()}, ensure_ascii=False)
+
+        # Write then rename so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size in self._entries())
+            else:
+                self._size += len(data.encode("utf-8"))
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self._size = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        entries = list(self._entries())
+        return {"entries": len(entries), "bytes": sum(size for _, _, size in entries), "max_bytes": self.max_bytes}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
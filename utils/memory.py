@@ -1,17 +1,19 @@
-from langchain.memory import ConversationSummaryBufferMemory
-from langchain_groq import ChatGroq
-from utils.logger import setup_logger
 from config.configs import MAX_BUFFER_SIZE, MAX_MEMORY_TOKENS
+from utils.token_counter import get_token_counter
 
-def create_memory(llm, max_buffer_size=MAX_BUFFER_SIZE, max_token_limit=MAX_MEMORY_TOKENS):
+def create_memory(llm, max_buffer_size=MAX_BUFFER_SIZE, max_token_limit=MAX_MEMORY_TOKENS, token_counter=None):
     """
     Returns a hybrid ConversationSummaryBufferMemory:
     - Keeps the last max_buffer_size messages intact
     - Summarizes older history when exceeding max_token_limit tokens
+    Tokens are counted locally with token_counter (default: the shared TOKEN_COUNTER backend).
     """
-    return ConversationSummaryBufferMemory(
+    from utils.summary_memory import TokenCountingSummaryBufferMemory
+
+    return TokenCountingSummaryBufferMemory(
         llm=llm,
         max_token_limit=max_token_limit,
         max_buffer_size=max_buffer_size,
-        memory_key="chat_history"
-    )
\ No newline at end of file
+        memory_key="chat_history",
+        token_counter=token_counter or get_token_counter(),
+    )
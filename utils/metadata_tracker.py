@@ -23,3 +23,6 @@ def update_ingestion_record(filename, checksum, session_id, state):
         "processed_at": datetime.now().isoformat(),
         "session_id": session_id
     }
+
+def remove_ingestion_record(filename, state):
+    return state.pop(filename, None)
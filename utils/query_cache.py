@@ -0,0 +1,95 @@
+import sys
+import json
+import threading
+from collections import OrderedDict
+from config.configs import (
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    QUERY_EMBEDDING_CACHE_MAX_BYTES,
+    RETRIEVAL_CACHE_MAX_ENTRIES,
+    RETRIEVAL_CACHE_MAX_BYTES,
+)
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as the cache key."""
+    return " ".join(query.lower().split())
+
+def make_key(*parts):
+    return json.dumps(parts, sort_keys=True, default=str)
+
+def estimate_size(value) -> int:
+    """Rough size in bytes of a cached value (lists/dicts of str, float, int)."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe exact-match LRU cache bounded by entry count and estimated bytes."""
+
+    def __init__(self, name, max_entries, max_bytes):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+
+    def put(self, key, value):
+        size = estimate_size(key) + estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# Query text -> embedding vector
+embedding_cache = LRUCache("query_embeddings", QUERY_EMBEDDING_CACHE_MAX_ENTRIES, QUERY_EMBEDDING_CACHE_MAX_BYTES)
+# (query, filters, retrieval params, index version) -> retrieved chunks
+retrieval_cache = LRUCache("retrieval_results", RETRIEVAL_CACHE_MAX_ENTRIES, RETRIEVAL_CACHE_MAX_BYTES)
+
+def get_cache_stats():
+    return {cache.name: cache.stats() for cache in (embedding_cache, retrieval_cache)}
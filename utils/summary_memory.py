@@ -0,0 +1,34 @@
+from typing import Any
+from langchain.memory import ConversationSummaryBufferMemory
+
+
+class TokenCountingSummaryBufferMemory(ConversationSummaryBufferMemory):
+    """
+    ConversationSummaryBufferMemory that prunes using a local TokenCounter instead of
+    llm.get_num_tokens_from_messages. Each message is counted once (the counter caches
+    per text), so a turn only tokenizes the new messages.
+    """
+
+    token_counter: Any = None
+
+    def buffer_token_count(self) -> int:
+        """Tokens of the running summary plus the buffered messages."""
+        return (
+            self.token_counter.count(self.moving_summary_buffer)
+            + self.token_counter.count_messages(self.chat_memory.messages)
+        )
+
+    def prune(self) -> None:
+        """Prune buffer if it exceeds max token limit."""
+        buffer = self.chat_memory.messages
+        counts = [self.token_counter.count_message(m) for m in buffer]
+        curr_buffer_length = sum(counts)
+        if curr_buffer_length > self.max_token_limit:
+            pruned_memory = []
+            while buffer and curr_buffer_length > self.max_token_limit:
+                pruned_memory.append(buffer.pop(0))
+                curr_buffer_length -= counts.pop(0)
+            self.moving_summary_buffer = self.predict_new_summary(
+                pruned_memory,
+                self.moving_summary_buffer,
+            )
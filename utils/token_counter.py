@@ -0,0 +1,73 @@
+import re
+import math
+import threading
+from functools import lru_cache
+from config.configs import TOKEN_COUNTER, TOKEN_COUNT_CACHE_SIZE
+
+# Pieces the approximate counter sees: words, numbers, and single punctuation marks
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+def _approximate_count(text: str) -> int:
+    # BPE vocabularies keep common short words whole and split long ones roughly every 4 chars
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _PIECE_RE.findall(text))
+
+def _tiktoken_count_fn():
+    import tiktoken
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+_BACKENDS = {
+    "approximate": lambda: _approximate_count,
+    "tiktoken": _tiktoken_count_fn,
+}
+
+def register_token_counter(name, factory):
+    """Registers a backend: factory() must return a callable mapping text -> token count."""
+    _BACKENDS[name] = factory
+
+
+class TokenCounter:
+    """
+    Counts tokens locally with a pluggable backend. Counts are cached per text, so
+    messages that were already counted (e.g. chat history) are never re-tokenized.
+    """
+
+    def __init__(self, count_fn, name="custom", cache_size=TOKEN_COUNT_CACHE_SIZE):
+        self.name = name
+        self._count = lru_cache(maxsize=cache_size)(count_fn)
+
+    def count(self, text: str) -> int:
+        return self._count(text) if text else 0
+
+    def count_message(self, message) -> int:
+        """Tokens for one chat message: "<role>: <content>", like get_buffer_string."""
+        role = getattr(message, "type", "message")
+        return self.count(f"{role}: {message.content}")
+
+    def count_messages(self, messages) -> int:
+        return sum(self.count_message(m) for m in messages)
+
+    def cache_info(self):
+        return self._count.cache_info()
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+def get_token_counter(name: str = TOKEN_COUNTER) -> TokenCounter:
+    """
+    Returns the shared counter for a backend. "auto" uses tiktoken when it is
+    installed and falls back to the approximate counter otherwise.
+    """
+    if name == "auto":
+        try:
+            import tiktoken  # noqa: F401
+            name = "tiktoken"
+        except ImportError:
+            name = "approximate"
+
+    with _counters_lock:
+        if name not in _counters:
+            _counters[name] = TokenCounter(_BACKENDS[name](), name=name)
+        return _counters[name]
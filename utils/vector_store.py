@@ -1,32 +1,211 @@
 import os
-from typing import List
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.docstore.document import Document
-from config.configs import VECTOR_STORE_DIR
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+from config.configs import VECTOR_STORE_DIR, VECTOR_STORE_DISTANCE, EMBEDDING_MODEL_NAME, EMBEDDING_BATCH_SIZE
+from utils.index_snapshots import current_version, publish_snapshot, snapshot_path
 
-def _get_embedding_model():
-    return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain.docstore.document import Document
+
+# langchain_community / langchain_huggingface pull in torch and
+# sentence-transformers, so they are imported on first use only.
+
+@lru_cache(maxsize=1)
+def _get_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+    # One model instance per process; loading the weights is the expensive part
+    from langchain_huggingface import HuggingFaceEmbeddings
+    # Unit-length embeddings make inner product and squared L2 both map to cosine similarity
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        encode_kwargs={"normalize_embeddings": True},
+    )
+
+def _legacy_index_dir():
+    # Index saved directly into VECTOR_STORE_DIR before snapshots were introduced
+    if os.path.exists(os.path.join(VECTOR_STORE_DIR, "index.faiss")):
+        return VECTOR_STORE_DIR
+    return None
+
+def _index_dir(version=None):
+    version = version or get_index_version()
+    if version is None:
+        return None
+    if version.startswith("legacy-"):
+        return _legacy_index_dir()
+    return snapshot_path(version)
 
 def _vector_store_exists():
-    return os.path.exists(os.path.join(VECTOR_STORE_DIR, "index.faiss"))
+    return get_index_version() is not None
+
+def get_index_version():
+    """
+    Returns the version of the published index (None if there is no index).
+    It changes every time a new snapshot is published or rolled back to.
+    """
+    version = current_version()
+    if version is not None:
+        return version
+    try:
+        stat = os.stat(os.path.join(VECTOR_STORE_DIR, "index.faiss"))
+    except OSError:
+        return None
+    return f"legacy-{stat.st_mtime_ns}-{stat.st_size}"
+
+def load_vector_store(version=None):
+    """Loads the given index version (default: the published one)."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
 
-def load_vector_store():
     embeddings = _get_embedding_model()
-    return FAISS.load_local(VECTOR_STORE_DIR, embeddings, allow_dangerous_deserialization=True)
+    try:
+        db = FAISS.load_local(_index_dir(version), embeddings, allow_dangerous_deserialization=True)
+    except (OSError, RuntimeError):
+        if version is None:
+            raise
+        # The snapshot was garbage-collected meanwhile; load whatever is published now
+        db = FAISS.load_local(_index_dir(), embeddings, allow_dangerous_deserialization=True)
+    # The distance strategy is not persisted by save_local; recover it from the index
+    if db.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        db.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+    return db
 
-def _save_vector_store(vector_store: FAISS):
-    vector_store.save_local(VECTOR_STORE_DIR)
+_loaded_store = (None, None)  # (db, version), replaced as a whole
+_reload_lock = threading.Lock()
 
-def create_or_update_vector_store(new_documents: List[Document]):
-    if not new_documents:
-        return None
+def get_vector_store():
+    """
+    Returns (db, version) for the published index, loading it only when the version
+    changed since the last call. While one thread loads a new version, other threads
+    keep getting the previous one instead of waiting. Meant for read-only use (retrieval).
+    """
+    global _loaded_store
+    version = get_index_version()
+    db, loaded_version = _loaded_store
+    if db is not None and loaded_version == version:
+        return db, version
 
-    if _vector_store_exists():
-        db = load_vector_store()
-        db.add_documents(new_documents)
-    else:
-        db = FAISS.from_documents(new_documents, _get_embedding_model())
+    if not _reload_lock.acquire(blocking=db is None):
+        return db, loaded_version
+    try:
+        db, loaded_version = _loaded_store
+        if db is None or loaded_version != version:
+            _loaded_store = (load_vector_store(version), version)
+        return _loaded_store
+    finally:
+        _reload_lock.release()
+
+def _save_vector_store(vector_store: "FAISS", state=None):
+    """
+    Publishes vector_store as a new index snapshot (see utils/index_snapshots.py).
+    Callers must hold index_write_lock() for the whole load-modify-save cycle.
+    """
+    return publish_snapshot(vector_store, state=state)
+
+def get_document_ids(db: "FAISS", doc_ids: Iterable[str]) -> List[str]:
+    """Returns the vector store ids of every chunk belonging to the given doc_ids."""
+    doc_ids = set(doc_ids)
+    return [
+        store_id for store_id, doc in db.docstore._dict.items()
+        if doc.metadata.get("doc_id") in doc_ids
+    ]
+
+def get_ids_by_doc_id(db: "FAISS") -> Dict[str, List[str]]:
+    """Returns {doc_id: vector store ids of its chunks} in a single pass over the docstore."""
+    ids_by_doc = {}
+    for store_id, doc in db.docstore._dict.items():
+        ids_by_doc.setdefault(doc.metadata.get("doc_id"), []).append(store_id)
+    return ids_by_doc
+
+def _new_store_kwargs(distance=VECTOR_STORE_DISTANCE):
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    if distance == "cosine":
+        return {"distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT}
+    return {}
 
-    _save_vector_store(db)
+def _add_batch(db: Optional["FAISS"], batch: List["Document"]):
+    from langchain_community.vectorstores import FAISS
+
+    if db is None:
+        return FAISS.from_documents(batch, _get_embedding_model(), **_new_store_kwargs())
+    db.add_documents(batch)
+    return db
+
+def add_documents_in_batches(
+    documents: Iterable["Document"],
+    db: Optional["FAISS"] = None,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+):
+    """
+    Embeds documents batch_size at a time and adds them to db (created on the first
+    batch if None). documents can be a generator; it is consumed lazily, so only one
+    batch of texts and embeddings is in memory at a time. Does not save. Returns db.
+    """
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            db = _add_batch(db, batch)
+            batch = []
+    if batch:
+        db = _add_batch(db, batch)
+    return db
+
+def build_vector_store_from_embeddings(texts, vectors, metadatas, embeddings, db=None, distance=VECTOR_STORE_DISTANCE):
+    """Adds precomputed embeddings to db (created with the given distance if None). Returns db."""
+    from langchain_community.vectorstores import FAISS
+
+    text_embeddings = list(zip(texts, vectors))
+    if db is None:
+        return FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, **_new_store_kwargs(distance))
+    db.add_embeddings(text_embeddings, metadatas=metadatas)
     return db
+
+def _to_similarity(db: "FAISS", raw_scores):
+    """
+    Converts raw FAISS scores to cosine similarity. Inner-product scores already are;
+    squared L2 distances between unit vectors satisfy d = 2 - 2 * cos.
+    """
+    import faiss
+
+    if db.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return [float(s) for s in raw_scores]
+    return [1.0 - float(d) / 2.0 for d in raw_scores]
+
+def _query_array(embedding):
+    import numpy as np
+
+    vector = np.array([embedding], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def similarity_search_by_vector(db: "FAISS", embedding: List[float], k: int) -> List[Tuple["Document", float]]:
+    """Top-k search returning (document, cosine similarity), most similar first."""
+    scores, indices = db.index.search(_query_array(embedding), k)
+    hits = [(i, s) for i, s in zip(indices[0], _to_similarity(db, scores[0])) if i != -1]
+    return [(db.docstore.search(db.index_to_docstore_id[i]), s) for i, s in hits]
+
+def range_search_by_vector(
+    db: "FAISS", embedding: List[float], min_similarity: float, max_results: int
+) -> List[Tuple["Document", float]]:
+    """
+    Returns every chunk with cosine similarity >= min_similarity in a single FAISS
+    range_search call, most similar first, capped at max_results.
+    """
+    import faiss
+
+    if db.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        radius = min_similarity  # keeps scores > radius
+    else:
+        radius = 2.0 - 2.0 * min_similarity  # keeps squared distances < radius
+    lims, scores, indices = db.index.range_search(_query_array(embedding), radius)
+
+    hits = sorted(
+        zip(indices[lims[0]:lims[1]], _to_similarity(db, scores[lims[0]:lims[1]])),
+        key=lambda hit: hit[1],
+        reverse=True,
+    )[:max_results]
+    return [(db.docstore.search(db.index_to_docstore_id[i]), s) for i, s in hits]
@@ -0,0 +1,44 @@
+import time
+import importlib
+import threading
+from config.configs import WARMUP_MODULES
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def _import_modules(modules, logger=None):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            if logger:
+                logger.warning(f"Warm-up import failed for {name}: {e}")
+            continue
+        if logger:
+            logger.debug(f"Warm-up imported {name} in {time.perf_counter() - start:.2f}s")
+
+def preload_heavy_modules(modules=None, background=True, logger=None):
+    """
+    Imports the heavy dependencies (LLM client, embeddings, FAISS, PDF loader)
+    ahead of first use so the first query or ingestion does not pay for them.
+    Runs at most once per process; returns the warm-up thread when running
+    in the background.
+    """
+    global _warmup_thread
+    modules = list(modules or WARMUP_MODULES)
+
+    if not background:
+        _import_modules(modules, logger)
+        return None
+
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(
+                target=_import_modules,
+                args=(modules, logger),
+                name="rag-warmup",
+                daemon=True,
+            )
+            _warmup_thread.start()
+        return _warmup_thread